@@ -6,13 +6,23 @@ import os
 import random
 from typing import Sequence, Iterable, Iterator, TypeVar, Mapping                                                              
 from faker import Faker                                                   
+from faker.providers import BaseProvider
 import mysql.connector                                                     
-from dataclasses import dataclass
 from datetime import date, datetime, timedelta                            
 import calendar                                                               
 import time
 import re
+import sys
+import multiprocessing
+import queue
+import tempfile
+import threading
 import unicodedata                                                                
+from itertools import accumulate, chain, islice
+from functools import lru_cache
+from contextlib import contextmanager
+from bisect import bisect
+import numpy as np
 from dotenv import load_dotenv                                               
 load_dotenv()   
 
@@ -25,6 +35,7 @@ load_dotenv()
 # -----------------------------------------------------------------------------------------------------------------------------------
 
 K = TypeVar("K")
+T = TypeVar("T")
 
 def normalize_distribution(dist: Mapping[K, float], *, round_to: int | None = None) -> dict[K, float]:
     if not dist:
@@ -53,17 +64,32 @@ DB_CONFIG = {
     "user": os.getenv("DB_USER", "root"),                                     
     "password": os.getenv("DB_PASS", ""),                                     
     "database": os.getenv("DB_NAME", "ecommerce_db"),                      
-    "charset": "utf8mb4"                                                      
+    "charset": "utf8mb4",
+    "allow_local_infile": True,  # necessário para o LOAD DATA LOCAL INFILE
 }
 
+# Carregar os clientes com LOAD DATA LOCAL INFILE (requer local_infile=ON no servidor).
+# Se o servidor recusar, o script volta automaticamente ao INSERT multi-linha.
+USE_LOAD_DATA_INFILE = True
+
 # Número total de clientes a gerar.
 N_CUSTOMERS = 10_000                                                          
 
 # Semente fixa para tornar geração de dados reprodutível.
 SEED = 42                                                                     
 
+# Nº máximo de nomes (próprios e apelidos) pré-gerados pelo Faker por país.
+# Os clientes sorteiam depois desses pools, em vez de chamarem o Faker linha a linha.
+NAME_POOL_SIZE = 1000
+
+# Nº de processos usados para pré-gerar os pools de nomes (um país por processo).
+NAME_POOL_WORKERS = os.cpu_count() or 1
+
 # Número de clientes a inserir por batch no MySQL.
-BATCH_SIZE = 1000                                                             
+BATCH_SIZE = 1000
+
+# Nº máximo de batches gerados à espera de serem inseridos (fila entre a thread de geração e a de inserção).
+PIPELINE_QUEUE_SIZE = 4                                                             
 
 # Percentagem de clientes por país (soma = 100).
 COUNTRY_DISTRIBUTION = {                                                      
@@ -83,6 +109,17 @@ COUNTRY_DISTRIBUTION = {
 CUSTOMERS_START = datetime(2023, 1, 1, 0, 0, 0)
 CUSTOMERS_END_EXCL = datetime(2025, 8, 1, 0, 0, 0)  # exclusive
 
+# Weights by month for the customer creation date (seasonality); weekends get an extra boost.
+SIGNUP_MONTH_WEIGHT = {
+    1:0.85, 2:0.90, 3:1.00, 4:1.05, 5:1.10,
+    6:0.95, 7:0.80, 8:0.85, 9:1.10, 10:1.20,
+    11:1.30, 12:1.50
+}
+SIGNUP_WEEKEND_BOOST = 1.2
+
+# Weights by hour of the day (peaks at 10–13h and 18–22h).
+SIGNUP_HOUR_WEIGHTS = [2.0 if 18 <= h <= 22 else 1.8 if 10 <= h <= 13 else 1.0 for h in range(24)]
+
 # Distribuição etária em percentagens.
 AGE_GROUPS = {                                                                
     (18, 29): 40,   # 40% between 18 and 30
@@ -107,6 +144,10 @@ CITIES_BY_COUNTRY = {
     "Croatia": ["Zagreb", "Split", "Rijeka", "Osijek", "Zadar","Pula", "Dubrovnik", "Slavonski Brod", "Karlovac", "Varazdin"],
 }
 
+# Versão imutável (tuplos) das cidades, usada no loop de geração.
+# As strings são internadas: todas as linhas partilham os mesmos ~100 objetos de cidade.
+CITIES_TUPLES = {c: tuple(sys.intern(city) for city in v) for c, v in CITIES_BY_COUNTRY.items()}
+
 EMAIL_DOMAIN_DISTRIBUTION = {
     'gmail.com': 40,
     'yahoo.com': 30,
@@ -129,17 +170,42 @@ FAKER_LOCALE_BY_COUNTRY = {
     "Ireland": "en_IE",
 }
 
-SQL_INSERT = """
+# INSERT multi-linha: o prefixo é seguido de um grupo de placeholders por cliente do batch.
+# Manter o BATCH_SIZE em poucos milhares para o statement ficar abaixo do max_allowed_packet.
+SQL_INSERT_PREFIX = """
 INSERT INTO customers (first_name, last_name, email, birth_date, city, country_id, created_at, updated_at)
-VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+VALUES """
+SQL_ROW_PLACEHOLDER = "(%s, %s, %s, %s, %s, %s, %s, %s)"
+
+# Carregamento em bloco a partir de um ficheiro TSV (o caminho é passado como parâmetro).
+SQL_LOAD_DATA = """
+LOAD DATA LOCAL INFILE %s
+INTO TABLE customers
+CHARACTER SET utf8mb4
+FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'
+LINES TERMINATED BY '\\n'
+(first_name, last_name, email, birth_date, city, country_id, created_at, updated_at)
 """
 
+# Erros MySQL que indicam que o LOAD DATA LOCAL está desativado (cliente ou servidor).
+LOAD_DATA_DISABLED_ERRNOS = {1148, 2068, 3948}
+
+# Durante o carregamento desliga, na sessão, unique_checks e foreign_key_checks (restaurados no fim).
+# Seguro aqui: os emails já são únicos do lado do Python e os country_id vêm da própria tabela countries.
+# Se True, não escreve o carregamento no binlog: sql_log_bin = 0 logo ao abrir a ligação, antes de qualquer
+# transação (requer privilégios; ignorado se falhar), reposto depois do commit.
+BULK_LOAD_SKIP_BINLOG = True
+
 # --------------------------------------------------------------------------------------------------------------------------------------
 # DATABASE
 # --------------------------------------------------------------------------------------------------------------------------------------
 
-def get_connection() -> "mysql.connector.connection.MySQLConnection":
-    return mysql.connector.connect(use_pure=True, **DB_CONFIG)
+def get_connection() -> "mysql.connector.abstracts.MySQLConnectionAbstract":
+    # Usa a extensão C do conector (protocolo e escaping em C); se não estiver instalada, usa a implementação pura em Python.
+    try:
+        return mysql.connector.connect(use_pure=False, **DB_CONFIG)
+    except ImportError:
+        return mysql.connector.connect(use_pure=True, **DB_CONFIG)
 
 
 
@@ -179,29 +245,22 @@ def safe_shift_year(dt: date, year: int) -> date:
 
 
 
-# Gera data de nascimento aleatória dentro do intervalo
-# Exp: random_birthdate(30, 65)
-# o resultado é dependente do dia em que corre (usa date.today()), o que significa que voltas a obter outras datas se correres noutro dia (mesmo com a mesma semente).
-def random_birthdate(age_min: int, age_max: int) -> date:                                               
+# Calcula os limites (em ordinais) das datas de nascimento de uma faixa etária
+# Exp: birthdate_bounds(30, 65, date(2025, 9, 29)) -> (ordinal de 1960-09-29, nº de dias até 1995-09-29)
+def birthdate_bounds(age_min: int, age_max: int, today: date) -> tuple[int, int]:
     """
-    Gera uma data de nascimento aleatória dentro de uma faixa etária.
+    Calcula o intervalo de datas de nascimento válidas para uma faixa etária.
 
     Args:
         age_min: Idade mínima (inclusive).
         age_max: Idade máxima (inclusive).
+        today: Data de referência.
 
     Returns:
-        Uma data de nascimento aleatória compatível com a faixa etária.
-
-    Notes:
-        O resultado depende da data atual (`date.today()`), portanto,
-        diferentes execuções podem gerar datas distintas mesmo com a mesma semente.
+        Um tuplo (min_ord, span): ordinal da data de nascimento mais antiga possível
+        e nº de dias entre essa data e a mais recente possível.
     """
     
-    # Obtém a data de hoje
-    # Exp: 2025-09-29
-    today = date.today()
-    
     # Data de nascimento mais antiga possível
     # Exp: min_birth = safe_shift_year('2025-09-29', 1960) = 1960-09-29                                                                    
     min_birth = safe_shift_year(today, today.year - age_max)
@@ -210,82 +269,71 @@ def random_birthdate(age_min: int, age_max: int) -> date:
     # EXP: max_birth = safe_shift_year('2025-09-29', 1995) = 1995-09-29                                
     max_birth = safe_shift_year(today, today.year - age_min)
     
-    # Número total de dias válidos entre limites                                  
-    span = (max_birth - min_birth).days                                                                 
-    
-    # Escolhe um dia aleatório dentro do intervalo
-    # random.randrange(n) devolve um número inteiro aleatório entre 0 e n-1. Como queremos incluir também o último dia (max_birth), usamos span + 1. 
-    # Assim, o intervalo vai de 0 até span.
-    # timedelta(days=X) representa um intervalo de tempo de X dias.
-    # Quando somamos a uma date, avançamos essa data em X dias.
-    # Como garantimos que min_birth é uma data válida, o resultado também será uma data válida. Quando somamos, o Python faz a aritmética de calendário automaticamente.
-    return min_birth + timedelta(days=random.randrange(span + 1))                                       
+    # date.toordinal() devolve o nº do dia no calendário (1 = 0001-01-01); o número total de dias válidos é a diferença
+    return min_birth.toordinal(), (max_birth - min_birth).days
 
 
 
-def random_signup_datetime(rng: random.Random, start: datetime, end_excl: datetime) -> datetime:
+def build_signup_day_table(start: datetime, end_excl: datetime) -> tuple[np.ndarray, np.ndarray]:
     """
-    Generates a "realistic" datetime for customer registration with monthly seasonality and a weekend boost.
+    Pré-calcula os dias do intervalo e as respetivas probabilidades (mês + boost de fim de semana).
+
+    Returns:
+        Um tuplo (dias como datetime64[D], probabilidades que somam 1).
     """
     if start >= end_excl:
         raise ValueError("`start` must be earlier than `end_excl`.")
 
-    # 1) Define the weights by month
-    month_weight = {
-        1:0.85, 2:0.90, 3:1.00, 4:1.05, 5:1.10,
-        6:0.95, 7:0.80, 8:0.85, 9:1.10, 10:1.20,
-        11:1.30, 12:1.50
-    }
-
-    # 2) Chose a day on the interval with weights on months and weekend boost.
-    days: list[tuple[datetime, float]] = []
-    d = start.date()
-    last = (end_excl - timedelta(seconds=1)).date()
-    while d <= last:
-        w = month_weight.get(d.month, 1.0)
-        if d.weekday() >= 5:  # Sáb/Dom
-            w *= 1.2
-        days.append((datetime(d.year, d.month, d.day), w))
-        d += timedelta(days=1)
-
-    total_w = sum(w for _, w in days)
-    pick_day = rng.choices([dt for dt, _ in days], weights=[w/total_w for _, w in days], k=1)[0]
-
-    # 3) hora do dia (picos às 10–13h e 18–22h)
-    hour_weights = [1.0]*24
-    for h in range(10, 14): hour_weights[h] = 1.8
-    for h in range(18, 23): hour_weights[h] = 2.0
-    hour = rng.choices(range(24), weights=hour_weights, k=1)[0]
-    minute = rng.randint(0, 59)
-    second = rng.randint(0, 59)
-    return pick_day.replace(hour=hour, minute=minute, second=second)
+    first = np.datetime64(start.date(), "D")
+    last = np.datetime64((end_excl - timedelta(seconds=1)).date(), "D")
+    days = np.arange(first, last + 1)
+
+    month_weight = np.array([SIGNUP_MONTH_WEIGHT.get(m, 1.0) for m in range(1, 13)])
+    months = days.astype("datetime64[M]").astype(np.int64) % 12      # 0 = janeiro
+    weekdays = (days.astype(np.int64) + 3) % 7                         # 1970-01-01 foi quinta-feira (0 = segunda)
+    weights = month_weight[months] * np.where(weekdays >= 5, SIGNUP_WEEKEND_BOOST, 1.0)  # Sáb/Dom
+
+    return days, weights / weights.sum()
+
 
 def build_created_at_schedule(
     n: int,
     start: datetime,
     end_excl: datetime,
-    rng: random.Random,
+    rng: np.random.Generator,
 ) -> list[datetime]:
     """
-    Gera N datetimes realistas no intervalo, ordena e força monotonia estrita (sem empates).
+    Gera N datetimes realistas no intervalo (sazonalidade mensal, boost ao fim de semana e picos horários),
+    ordena e força monotonia estrita (sem empates).
+
+    Todos os sorteios são feitos em bloco com NumPy, em segundos desde a epoch (int64);
+    só a conversão final para datetime acontece por linha.
     """
     if n <= 0:
         return []
 
-    pool = [random_signup_datetime(rng, start, end_excl) for _ in range(n)]
-    pool.sort()  # ordem cronológica
+    # 1) dia (pesos por mês + fim de semana) e hora do dia (picos às 10–13h e 18–22h)
+    days, day_p = build_signup_day_table(start, end_excl)
+    hour_w = np.asarray(SIGNUP_HOUR_WEIGHTS)
+    day_idx = rng.choice(len(days), size=n, p=day_p)
+    hours = rng.choice(24, size=n, p=hour_w / hour_w.sum())
+    minutes = rng.integers(0, 60, size=n)
+    seconds = rng.integers(0, 60, size=n)
 
-    # garantir strictly increasing: se igual ou a recuar (improvável), empurra +1..5s
-    for i in range(1, n):
-        if pool[i] <= pool[i-1]:
-            bump = rng.randint(1, 5)
-            pool[i] = pool[i-1] + timedelta(seconds=bump)
+    ts = days[day_idx].astype("datetime64[s]").astype(np.int64) + hours * 3600 + minutes * 60 + seconds
+    ts.sort()  # ordem cronológica
 
-        # cap no end_excl-1s (só para segurança)
-        if pool[i] >= end_excl:
-            pool[i] = end_excl - timedelta(seconds=1)
+    # 2) garantir strictly increasing: cada instante fica pelo menos +1..5s depois do anterior.
+    # ts'[i] = max(ts[i], ts'[i-1] + bump[i])  <=>  ts'[i] = c[i] + max(ts[:i+1] - c[:i+1]), com c = cumsum(bump)
+    bumps = np.cumsum(rng.integers(1, 6, size=n))
+    ts = bumps + np.maximum.accumulate(ts - bumps)
+
+    # cap no end_excl-1s (só para segurança)
+    np.minimum(ts, int(np.datetime64(end_excl, "s").astype(np.int64)) - 1, out=ts)
+
+    # datetime64[s] -> datetime.datetime (conversão em C)
+    return ts.astype("datetime64[s]").tolist()
 
-    return pool
 
 # Função para normalizar nomes em emails
 def normalize_email_names(text: str) -> str:
@@ -402,34 +450,121 @@ def validate_distributions(
             raise ValueError(f"Negative weight for country '{country}'.")
 
 
-def build_fakers(locales_by_country: dict[str, str], seed: int) -> dict[str, Faker]:
+# Implementação original do Faker (usada como fallback para tipos de `elements` pouco comuns).
+_FAKER_RANDOM_ELEMENT = BaseProvider.random_element
+
+def fast_random_element(self: BaseProvider, elements=("a", "b", "c")):
     """
-    Cria instâncias Faker por país, com seeds fixos para reprodutibilidade.
+    Versão rápida de `BaseProvider.random_element` (a abordagem do Snowfakery).
+
+    O original reconstrói a lista de pesos e passa por `random_elements` em cada chamada.
+    Aqui as chaves e os pesos acumulados dos OrderedDict são guardados em cache no próprio objeto,
+    e o sorteio é feito diretamente com o `random` da instância. O resultado é igual ao do original.
+    """
+    rnd = self.generator.random
+    
+    if isinstance(elements, dict):
+        cached = getattr(elements, "_cached_choice_list", None)
+        if cached is None:
+            cum_weights = tuple(accumulate(elements.values()))
+            cached = (tuple(elements.keys()), cum_weights, cum_weights[-1] + 0.0)
+            setattr(elements, "_cached_choice_list", cached)
+        keys, cum_weights, total = cached
+        if self.__use_weighting__:
+            # bisseção direta nos pesos acumulados (igual a rnd.choices(keys, cum_weights=..., k=1)[0])
+            return keys[bisect(cum_weights, rnd.random() * total, 0, len(keys) - 1)]
+        return rnd.choice(keys)
+    
+    if isinstance(elements, (list, tuple, str)):
+        return rnd.choice(elements)
+    
+    return _FAKER_RANDOM_ELEMENT(self, elements)
+
+
+@contextmanager
+def fast_random_element_enabled() -> Iterator[None]:
+    """
+    Substitui `BaseProvider.random_element` por `fast_random_element` só durante o bloco
+    e repõe o original no fim (mesmo em caso de erro), para o patch não ficar ativo no resto do processo.
+    """
+    BaseProvider.random_element = fast_random_element
+    try:
+        yield
+    finally:
+        BaseProvider.random_element = _FAKER_RANDOM_ELEMENT
+
+
+def build_country_name_pool(spec: tuple[str, int, int]) -> tuple[tuple[str, ...], tuple[str, ...]]:
+    """
+    Cria uma instância Faker para um locale e pré-gera os pools de nomes desse país.
+
+    Corre num processo worker (ver `build_name_pools`), pelo que tem de estar ao nível do módulo.
+
+    Args:
+        spec: Tuplo (locale, seed, pool_size), ex: ('pt_PT', 42, 1000).
+
+    Returns:
+        Um tuplo (nomes_proprios, apelidos).
+    """
+    
+    locale, seed, size = spec
+    
+    # O método seed_instance atribui uma semente (seed) ao objeto Faker.
+    # Assim, cada país vai gerar sempre os mesmos nomes em execuções diferentes (reprodutibilidade por país),
+    # independentemente do processo onde corre.
+    fk = Faker(locale)
+    fk.seed_instance(seed)
+    
+    # Caminho rápido do random_element (usado por first_name/last_name) só durante a geração dos pools
+    with fast_random_element_enabled():
+        # Resolve os métodos uma só vez (cada `fk.first_name` passa pelo __getattr__ do proxy do Faker)
+        first_name, last_name = fk.first_name, fk.last_name
+        first_pool = tuple(first_name() for _ in range(size))
+        last_pool = tuple(last_name() for _ in range(size))
+    return first_pool, last_pool
+
+
+def build_name_pools(
+    locales_by_country: dict[str, str],
+    demand_by_country: Mapping[str, int],
+    pool_size: int,
+    seed: int,
+    workers: int,
+) -> dict[str, tuple[tuple[str, ...], tuple[str, ...]]]:
+    """
+    Pré-gera, por país, um pool de nomes próprios e outro de apelidos, em paralelo.
 
     Args:
         locales_by_country: Mapeamento país → locale do Faker (ex: 'pt_PT').
+        demand_by_country: Nº de clientes a gerar por país.
+        pool_size: Tamanho máximo de cada pool.
         seed: Valor base da semente aleatória global.
+        workers: Nº de processos a usar (1 = sem multiprocessing).
 
     Returns:
-        Dicionário {pais: Faker_instanciado}.
+        Dicionário {pais: (nomes_proprios, apelidos)}.
+
+    Notes:
+        Cada pool tem no máximo `demand` nomes, para nunca custar mais chamadas ao Faker do que a geração direta.
     """
     
-    # Cria instâncias Faker específicas por país
-    # Ex: fakers = {'Portugal': Faker object(pt_PT), 'Spain': Faker object(es_ES), 'France': Faker object(fr_FR), ...)
-    fakers = {c: Faker(loc) for c, loc in locales_by_country.items()}
+    # Como usamos SEED + i, cada país recebe uma semente diferente, evitando que os resultados se repitam entre países.
+    # Ex: specs = [('pt_PT', 42, 1000), ('es_ES', 43, 1000), ...]
+    countries = list(locales_by_country)
+    specs = [
+        (locales_by_country[c], seed + i, max(1, min(pool_size, demand_by_country.get(c, 0))))
+        for i, c in enumerate(countries)
+    ]
     
-    # A função enumerate pega numa lista (ou outro iterável) e devolve cada elemento junto com o seu número de ordem (índice), sob a forma de pares: (índice, elemento). 
-    # No caso de aplicar enumerate a fakers.items(), cada elemento é um par (chave, valor), pelo que o resultado tem a forma (índice, (chave, valor)) → um par cujo segundo elemento é um tuplo. 
-    # O resultado desta função é um objeto enumerador. Esse objeto é preguiçoso (lazy): só gera os pares (índice, elemento) à medida que tu vais percorrendo. 
-    # Como é iterável, para ver o conteúdo podemos convertê-lo para lista: list(enumerate(fakers.items())) = [(0, ('Portugal', <Faker pt_PT>)), (1, ('Spain', <Faker es_ES>)), (2, ('France', <Faker fr_FR>)), ...].
-    for i, (country, fk) in enumerate(fakers.items()):
-        
-        # O método seed_instance atribui uma semente (seed) a um objeto Faker. 
-        # Assim, cada instância de Faker vai gerar sempre os mesmos dados em execuções diferentes (reprodutibilidade por país). 
-        # Como usamos SEED + i, cada país recebe uma semente diferente, evitando que os resultados se repitam entre países.
-        fk.seed_instance(seed + i)
-        
-    return fakers
+    # Cada país é independente: o Faker de cada locale corre no seu próprio processo
+    workers = min(workers, len(specs))
+    if workers > 1:
+        with multiprocessing.Pool(workers) as pool:
+            results = pool.map(build_country_name_pool, specs, chunksize=1)
+    else:
+        results = [build_country_name_pool(spec) for spec in specs]
+    
+    return dict(zip(countries, results))
 
 
 def fetch_country_name_to_id(cur) -> dict[str, int]:
@@ -452,57 +587,45 @@ def fetch_country_name_to_id(cur) -> dict[str, int]:
 # DATA GENERATION
 # --------------------------------------------------------------------------------------------------------------------------------------
 
-@dataclass(frozen=True)
-class CustomerRow:
-    first_name: str
-    last_name: str
-    email: str
-    birth_date: date
-    city: str
-    country_id: int
-    created_at: datetime
+# Linha de cliente como tuplo simples, na ordem exata das colunas do INSERT / LOAD DATA:
+# (first_name, last_name, email, birth_date, city, country_id, created_at, updated_at)
+CustomerRow = tuple[str, str, str, date, str, int, datetime, datetime]
 
 
 def generate_customer(
-    country_names: list[str],
-    country_weights: Sequence[float],
-    age_ranges: list[tuple[int, int]],
-    age_weights: Sequence[float],
-    cities_by_country: dict[str, list[str]],
-    fakers: dict[str, Faker],
+    cname: str,
+    birth: date,
+    city: str,
+    name_pools: Mapping[str, tuple[Sequence[str], Sequence[str]]],
     name_to_id: dict[str, int],
     *,
     email_domain: str,
+    created_at: datetime,
     email_rng: random.Random,
     used_locals: set[str],
     used_emails: set[str],
 ) -> tuple[str, CustomerRow]:
     """
-    Gera um cliente aleatório com base nas distribuições configuradas.
+    Gera um cliente aleatório para um país e faixa etária já sorteados.
 
     Args:
-        country_names: Lista de nomes de países disponíveis.
-        country_weights: Pesos normalizados para seleção de países.
-        age_ranges: Faixas etárias possíveis (tuplos de idade mínima e máxima).
-        age_weights: Pesos normalizados para seleção de faixas etárias.
-        cities_by_country: Mapeamento país → lista de cidades.
-        fakers: Instâncias Faker específicas por país.
+        cname: País do cliente (sorteado previamente em bloco).
+        birth: Data de nascimento (sorteada em bloco a partir de `birthdate_bounds`).
+        city: Cidade do cliente (sorteada no loop de geração).
+        name_pools: Pools de (nomes próprios, apelidos) por país.
         name_to_id: Mapeamento país → ID do país na BD.
+        email_domain: Domínio do email (do schedule de domínios).
+        created_at: Data de registo (do schedule sequencial).
 
     Returns:
         Um tuplo (country_name, CustomerRow).
     """
     
-    # Seleciona país e faixa etária
-    cname = random.choices(country_names, weights=country_weights, k=1)[0]
-    amin, amax = random.choices(age_ranges, weights=age_weights, k=1)[0]
-    
-    # Gera dados pessoais e data de nascimento
-    birth = random_birthdate(amin, amax)
-    fk = fakers[cname]
+    # Gera dados pessoais
+    first_pool, last_pool = name_pools[cname]
     
-    first = fk.first_name()
-    last = fk.last_name()
+    first = random.choice(first_pool)
+    last = random.choice(last_pool)
     
     # Email
     email = make_unique_email(
@@ -512,78 +635,220 @@ def generate_customer(
         used_emails=used_emails,
     )
     
-    # Constrói o objeto CustomerRow
-    row = CustomerRow(
-        first_name=first,
-        last_name=last,
-        email=email,
-        birth_date=birth,
-        city=random.choice(cities_by_country[cname]),
-        country_id=name_to_id[cname],
-        created_at=datetime.min,  # placeholder
-    )
+    # Constrói a linha já na ordem das colunas (updated_at = created_at)
+    row = (first, last, email, birth, city, name_to_id[cname], created_at, created_at)
     return cname, row
 
 
-def batched(iterable: Iterable[CustomerRow], size: int) -> Iterator[list[CustomerRow]]:
+try:
+    # Python 3.12+: implementação em C na biblioteca standard (devolve tuplos)
+    from itertools import batched
+except ImportError:
+    def batched(iterable: Iterable[CustomerRow], size: int) -> Iterator[tuple[CustomerRow, ...]]:
+        """
+        Divide um iterável em tuplos (batches) de tamanho máximo `size`.
+
+        Fallback para Python < 3.12, com a mesma semântica de `itertools.batched`:
+        cada batch é recolhido por `islice` (em C), sem `.append` linha a linha.
+
+        Args:
+            iterable: Fonte de linhas CustomerRow.
+            size: Número máximo de elementos por batch.
+
+        Yields:
+            Tuplos de CustomerRow com até `size` elementos (o último pode ser incompleto).
+        """
+        
+        it = iter(iterable)
+        while batch := tuple(islice(it, size)):
+            yield batch
+
+# Marca de fim da fila do pipeline
+_PIPELINE_DONE = object()
+
+def iterate_in_background(items: Iterable[T], maxsize: int) -> Iterator[T]:
     """
-    Divide um iterável em listas (batches) de tamanho máximo `size`.
+    Consome `items` numa thread produtora e devolve-os através de uma fila limitada.
+
+    Permite sobrepor a geração dos batches (CPU) com a inserção na BD (I/O de rede, que liberta o GIL).
 
     Args:
-        iterable: Fonte de objetos CustomerRow.
-        size: Número máximo de elementos por batch.
+        items: Iterável a consumir na thread produtora (ex: batches de clientes).
+        maxsize: Nº máximo de elementos à espera na fila.
 
     Yields:
-        Listas de CustomerRow com até `size` elementos.
+        Os elementos de `items`, pela mesma ordem.
+
+    Notes:
+        Uma exceção na thread produtora é relançada no consumidor. Se o consumidor parar a meio
+        (ex: erro MySQL), a fila é drenada para a thread produtora terminar.
     """
     
-    batch: list[CustomerRow] = []
+    q: queue.Queue = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
     
-    for item in iterable:
-        batch.append(item)
-        
-        # Quando o batch atinge o tamanho máximo, envia-o e limpa
-        if size and len(batch) >= size:
-            yield batch
-            batch = []
+    def produce() -> None:
+        try:
+            for item in items:
+                if stop.is_set():
+                    return
+                q.put(item)
+        except BaseException as e:
+            q.put(e)
+            return
+        q.put(_PIPELINE_DONE)
     
-    # Garante que o último batch (incompleto) também é enviado
-    if batch:
-        yield batch
+    producer = threading.Thread(target=produce, name="row-producer", daemon=True)
+    producer.start()
+    
+    try:
+        while True:
+            item = q.get()
+            if item is _PIPELINE_DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        while producer.is_alive():
+            try:
+                q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        producer.join()
 
 # --------------------------------------------------------------------------------------------------------------------------------------
 # I/O NA BD
 # --------------------------------------------------------------------------------------------------------------------------------------
 
-def insert_batch(cur, rows: list[CustomerRow]) -> int:
+@contextmanager
+def bulk_load_session(cur) -> Iterator[None]:
+    """
+    Relaxa as verificações da sessão MySQL durante um carregamento em bloco e repõe-nas no fim.
+
+    Desliga `unique_checks` e `foreign_key_checks` (evita lookups às tabelas referenciadas e
+    verificações de unicidade linha a linha). O `sql_log_bin` é tratado à parte (`disable_session_binlog`),
+    porque o MySQL não o deixa mudar dentro de uma transação.
+
+    Args:
+        cur: Cursor MySQL ativo.
+
+    Notes:
+        Os valores anteriores da sessão são repostos mesmo em caso de erro.
+    """
+    
+    cur.execute("SELECT @@SESSION.unique_checks, @@SESSION.foreign_key_checks")
+    unique_checks, fk_checks = cur.fetchone()
+    cur.execute("SET SESSION unique_checks = 0, foreign_key_checks = 0")
+    
+    try:
+        yield
+    finally:
+        cur.execute(
+            "SET SESSION unique_checks = %s, foreign_key_checks = %s",
+            (int(unique_checks), int(fk_checks)),
+        )
+
+
+def disable_session_binlog(conn: "mysql.connector.abstracts.MySQLConnectionAbstract") -> int | None:
+    """
+    Desliga o binary log da sessão (sql_log_bin = 0) se BULK_LOAD_SKIP_BINLOG, e devolve o valor anterior
+    (None se não foi alterado). O MySQL recusa mudar sql_log_bin dentro de uma transação (erro 1694), por isso
+    tem de ser chamada antes do primeiro statement da sessão. Exige privilégios; sem eles o carregamento
+    continua com binlog.
+    """
+    if not BULK_LOAD_SKIP_BINLOG:
+        return None
+    with conn.cursor() as cur:
+        cur.execute("SELECT @@SESSION.sql_log_bin")
+        (log_bin,) = cur.fetchone()
+        try:
+            cur.execute("SET SESSION sql_log_bin = 0")
+        except mysql.connector.Error as e:
+            print(f"[info] Keeping binary logging on for this load ({e.msg}).")
+            return None
+    return int(log_bin)
+
+
+def restore_session_binlog(conn: "mysql.connector.abstracts.MySQLConnectionAbstract", log_bin: int | None) -> None:
+    """
+    Repõe o sql_log_bin anterior (ver disable_session_binlog). Só depois do commit, fora da transação;
+    em caso de erro não é preciso: a ligação é fechada e o valor da sessão perde-se com ela.
+    """
+    if log_bin is not None:
+        with conn.cursor() as cur:
+            cur.execute("SET SESSION sql_log_bin = %s", (log_bin,))
+
+
+@lru_cache(maxsize=None)
+def insert_sql(n_rows: int) -> str:
+    """
+    Devolve o INSERT multi-linha para `n_rows` clientes.
+
+    Em cache: com um cursor preparado, o mysql.connector só reutiliza o statement já preparado
+    no servidor se receber o mesmo objeto string (todos os batches completos partilham o mesmo).
+    """
+    
+    return SQL_INSERT_PREFIX + ",".join([SQL_ROW_PLACEHOLDER] * n_rows)
+
+
+def insert_batch(cur, rows: Sequence[CustomerRow]) -> int:
     """
     Insere um batch de clientes na base de dados MySQL.
 
+    Args:
+        cur: Cursor MySQL ativo (de preferência preparado: `conn.cursor(prepared=True)`).
+        rows: Batch de CustomerRow a inserir.
+
+    Returns:
+        Número de registos inseridos.
+    """
+    
+    if not rows:
+        return 0
+    
+    # Executa o batch inteiro num único INSERT ... VALUES (...),(...),... (1 round-trip por batch)
+    # As linhas já são tuplos na ordem das colunas: basta achatá-las nos parâmetros
+    cur.execute(insert_sql(len(rows)), list(chain.from_iterable(rows)))
+    
+    return len(rows)
+
+def tsv_field(value: object) -> str:
+    """
+    Converte um valor para um campo TSV compatível com o LOAD DATA (NULL -> \\N, escapes de \\, tab e newline).
+    """
+    
+    if value is None:
+        return "\\N"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+
+def load_batch(cur, rows: Sequence[CustomerRow]) -> int:
+    """
+    Carrega um batch de clientes com LOAD DATA LOCAL INFILE, através de um ficheiro TSV temporário.
+
     Args:
         cur: Cursor MySQL ativo.
-        rows: Lista de CustomerRow a inserir.
+        rows: Batch de CustomerRow a inserir.
 
     Returns:
         Número de registos inseridos.
     """
     
-    # Constrói tuplos na ordem exata das colunas do SQL_INSERT
-    payload = [
-        (
-            r.first_name, 
-            r.last_name, 
-            r.email,
-            r.birth_date, 
-            r.city, 
-            r.country_id, 
-            r.created_at,
-            r.created_at,  # updated_at = created_at
-         )
-        for r in rows
-    ]
+    if not rows:
+        return 0
+    
+    # O conector lê o ficheiro a partir do disco, por isso o TSV é escrito num ficheiro temporário
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", newline="\n", suffix=".tsv", delete=False) as f:
+        for r in rows:
+            f.write("\t".join(map(tsv_field, r)))
+            f.write("\n")
     
-    # Executa inserção em batch
-    cur.executemany(SQL_INSERT, payload)
+    try:
+        cur.execute(SQL_LOAD_DATA, (f.name,))
+    finally:
+        os.remove(f.name)
     
     return len(rows)
 
@@ -595,9 +860,8 @@ def run(n_customers: int, batch_size: int, seed: int) -> None:
     start_time = time.perf_counter()
     random.seed(seed)
 
-    # 1) valida configs e prepara Faker
+    # 1) valida configs
     validate_distributions(COUNTRY_DISTRIBUTION, CITIES_BY_COUNTRY, FAKER_LOCALE_BY_COUNTRY)
-    fakers = build_fakers(FAKER_LOCALE_BY_COUNTRY, seed)
 
     # 2) estruturas auxiliares
     counts_by_country = {c: 0 for c in COUNTRY_DISTRIBUTION}
@@ -606,13 +870,45 @@ def run(n_customers: int, batch_size: int, seed: int) -> None:
     age_ranges = list(AGE_WEIGHTS.keys())
     age_weights = list(AGE_WEIGHTS.values())
 
+    # 2.1) sorteia país e faixa etária de todos os clientes de uma só vez (2 chamadas em C em vez de 2*N)
+    np_rng = np.random.default_rng(seed)
+    country_idx = np_rng.choice(len(country_names), size=n_customers, p=country_weights)
+    age_idx = np_rng.choice(len(age_ranges), size=n_customers, p=age_weights)
+
+    # 2.2) datas de nascimento de todos os clientes em bloco: limites (ordinais) por faixa etária,
+    # calculados uma vez, e um deslocamento aleatório em dias por cliente (0..span, inclusive).
+    today = date.today()
+    min_ords, spans = np.array(
+        [birthdate_bounds(amin, amax, today) for amin, amax in age_ranges], dtype=np.int64
+    ).T
+    birth_ords = min_ords[age_idx] + np_rng.integers(0, spans[age_idx] + 1)
+
+    # 2.3) created_at sequencial (IDs baixos mais cedo), também sorteado em bloco
+    created_schedule = build_created_at_schedule(
+        n_customers, CUSTOMERS_START, CUSTOMERS_END_EXCL, np_rng
+    )
+
+    # 2.4) pools de nomes por país (Faker em paralelo), dimensionados pela procura sorteada.
+    # Feito antes de abrir a ligação, para os processos worker não herdarem o socket.
+    demand = np.bincount(country_idx, minlength=len(country_names))
+    name_pools = build_name_pools(
+        FAKER_LOCALE_BY_COUNTRY,
+        {c: int(demand[k]) for k, c in enumerate(country_names)},
+        NAME_POOL_SIZE,
+        seed,
+        NAME_POOL_WORKERS,
+    )
+
     # 3) conexão e transação
     conn = get_connection()
+    # antes do primeiro statement: o MySQL não deixa mudar sql_log_bin dentro de uma transação
+    log_bin = disable_session_binlog(conn)
     conn.autocommit = False
     total = batches = 0
 
     try:
-        with conn.cursor() as cur:
+        # cursor normal para SELECT/LOAD DATA; cursor preparado (parse único no servidor) para o INSERT de fallback
+        with conn.cursor() as cur, conn.cursor(prepared=True) as insert_cur:
             cur.execute("SET time_zone = '+00:00';")
             
             # 3.1) mapa países → id
@@ -621,13 +917,7 @@ def run(n_customers: int, batch_size: int, seed: int) -> None:
             if missing:
                 raise ValueError(f"Country(ies) missing in table 'countries': {missing}")
 
-            # 3.2) precomputar created_at sequencial (IDs baixos mais cedo)
-            rng = random.Random(seed)
-            created_schedule = build_created_at_schedule(
-                n_customers, CUSTOMERS_START, CUSTOMERS_END_EXCL, rng
-            )
-
-            # emails já existentes (para não colidir em re-execuções)
+            # 3.2) emails já existentes (para não colidir em re-execuções)
             existing_emails = fetch_existing_emails(cur)
             used_emails: set[str] = set(existing_emails)
 
@@ -645,36 +935,54 @@ def run(n_customers: int, batch_size: int, seed: int) -> None:
 
             # rng separado para os dígitos de colisão (reprodutível)
             email_rng = random.Random(seed + 555)
+
             
             # 3.3) gerador de linhas que consome o schedule
+            # os sorteios em NumPy são convertidos uma vez para listas Python: iterar com zip
+            # evita indexar arrays NumPy (e criar escalares NumPy) em cada linha.
+            row_countries = [country_names[k] for k in country_idx.tolist()]
+            row_birthdates = list(map(date.fromordinal, birth_ords.tolist()))
+
             def row_stream() -> Iterator[CustomerRow]:
-                for i in range(n_customers):
-                    cname, row = generate_customer(
-                        country_names, country_weights, age_ranges, age_weights,
-                        CITIES_BY_COUNTRY, fakers, name_to_id,
-                        email_domain=domain_schedule[i],
+                _choice = random.choice
+                _cities = CITIES_TUPLES
+                _generate = generate_customer
+                for cname, birth, domain, created_at in zip(
+                    row_countries, row_birthdates, domain_schedule, created_schedule
+                ):
+                    _, row = _generate(
+                        cname, birth, _choice(_cities[cname]),
+                        name_pools, name_to_id,
+                        email_domain=domain,
+                        created_at=created_at,
                         email_rng=email_rng,
                         used_locals=used_locals,
                         used_emails=used_emails
                     )
                     counts_by_country[cname] += 1
-                    
-                    # substitui o created_at aleatório pelo sequencial
-                    yield CustomerRow(
-                        first_name=row.first_name,
-                        last_name=row.last_name,
-                        email=row.email,
-                        birth_date=row.birth_date,
-                        city=row.city,
-                        country_id=row.country_id,
-                        created_at=created_schedule[i],
-        )
-
-            # 3.3) inserir em batches
-            for batch in batched(row_stream(), batch_size or n_customers):
-                total += insert_batch(cur, batch)
-                conn.commit()
-                batches += 1
+                    yield row
+
+            # 3.3) inserir em batches, numa única transação (um só commit/fsync no fim).
+            # Os batches são gerados numa thread à parte enquanto o batch anterior é enviado ao MySQL.
+            use_load_data = USE_LOAD_DATA_INFILE
+            pipeline = iterate_in_background(batched(row_stream(), batch_size or n_customers), PIPELINE_QUEUE_SIZE)
+            with bulk_load_session(cur):
+                for batch in pipeline:
+                    if use_load_data:
+                        try:
+                            total += load_batch(cur, batch)
+                            batches += 1
+                            continue
+                        except mysql.connector.Error as e:
+                            if e.errno not in LOAD_DATA_DISABLED_ERRNOS:
+                                raise
+                            print(f"[info] LOAD DATA LOCAL INFILE unavailable ({e.msg}); falling back to multi-row INSERT.")
+                            use_load_data = False
+                    total += insert_batch(insert_cur, batch)
+                    batches += 1
+
+        conn.commit()
+        restore_session_binlog(conn, log_bin)
 
     except mysql.connector.Error as e:
         conn.rollback()
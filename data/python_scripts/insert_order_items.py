@@ -3,13 +3,19 @@
 # ------------------------------------------------------------------------------------------------------------------------------------
 
 import os
-import random
+import queue
+import tempfile
+import threading
 import time
-from decimal import Decimal
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import  Iterable, Iterator, Mapping, TypeVar, Union
 from dataclasses import dataclass
-from typing import  Mapping, Sequence, TypeVar, Union
 
 import mysql.connector
+import mysql.connector.pooling
+import numpy as np
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -19,6 +25,7 @@ load_dotenv()
 # ------------------------------------------------------------------------------------------------------------------------------------
 
 K = TypeVar("K")
+T = TypeVar("T")
 
 def normalize_distribution(dist: Mapping[K, Union[int, float]]) -> dict[K, float]:
     """
@@ -33,6 +40,64 @@ def normalize_distribution(dist: Mapping[K, Union[int, float]]) -> dict[K, float
         raise ValueError("Distribution must have positive weights.")
     return {k: float(v) / total for k, v in dist.items()}
 
+
+def cumulative_table(weights: Mapping[int, float]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Pré-calcula (chaves, distribuição acumulada) de pesos normalizados, para sortear por bisseção
+    (`np.searchsorted`). O último valor é fixado em 1.0 para absorver erros de arredondamento.
+    """
+    if not weights:
+        raise ValueError("Empty weights.")
+    keys = np.fromiter(weights.keys(), dtype=np.int64, count=len(weights))
+    cdf = np.cumsum(np.fromiter(weights.values(), dtype=np.float64, count=len(weights)))
+    cdf[-1] = 1.0
+    return keys, cdf
+
+_PIPELINE_DONE = object()
+
+
+def iterate_in_background(items: Iterable[T], maxsize: int) -> Iterator[T]:
+    """
+    Consome `items` numa thread produtora e devolve-os através de uma fila limitada.
+
+    Permite sobrepor a geração das linhas (CPU, NumPy) com o envio para a BD (I/O de rede, que liberta o GIL).
+    Uma exceção na thread produtora é relançada no consumidor; se o consumidor parar a meio,
+    a fila é drenada para a thread produtora terminar.
+    """
+    q: queue.Queue = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if stop.is_set():
+                    return
+                q.put(item)
+        except BaseException as e:
+            q.put(e)
+            return
+        q.put(_PIPELINE_DONE)
+
+    producer = threading.Thread(target=produce, name="order-items-producer", daemon=True)
+    producer.start()
+
+    try:
+        while True:
+            item = q.get()
+            if item is _PIPELINE_DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        while producer.is_alive():
+            try:
+                q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        producer.join()
+
 # ------------------------------------------------------------------------------------------------------------------------------------
 # CONFIGS
 # ------------------------------------------------------------------------------------------------------------------------------------
@@ -44,6 +109,7 @@ DB_CONFIG: dict[str, Union[str, int]] = {
     "password": os.getenv("DB_PASS", ""),
     "database": os.getenv("DB_NAME", "ecommerce_db_test"),
     "charset": "utf8mb4",
+    "allow_local_infile": True,  # necessário para o LOAD DATA LOCAL INFILE
 }
 
 SEED: int = 42
@@ -52,10 +118,12 @@ SEED: int = 42
 # Interpretação: ~40% das encomendas têm 1 linha, 30% têm 2, etc.
 CART_SIZE_DIST: dict[int, int] = {1: 40,2: 30, 3: 15, 4: 10, 5: 4, 6: 1}
 CART_SIZE_WEIGHTS = normalize_distribution(CART_SIZE_DIST)
+CART_SIZE_TABLE = cumulative_table(CART_SIZE_WEIGHTS)
 
 # Quantidade por linha (75% das linhas têm qty=1, 18% qty=2, etc.)
 QTY_DIST: dict[int, int] = {1: 75, 2: 18, 3: 5, 4: 2}
 QTY_WEIGHTS = normalize_distribution(QTY_DIST)
+QTY_TABLE = cumulative_table(QTY_WEIGHTS)
 
 # Pesos por categoria (modulam prob. de seleção dos produtos)
 CATEGORY_WEIGHTS: dict[str, float] = {
@@ -78,60 +146,112 @@ CLEAR_EXISTING_ORDER_ITEMS: bool = True
 # Batch size para inserir no MySQL
 BATCH_SIZE: int = 20_000
 
+# Nº de ligações (pool) / threads a inserir em paralelo, cada uma a retirar blocos da fila da geração
+# (não há divisão fixa das linhas por ligação).
+# Com 1 (default), tudo corre na ligação principal, numa única transação com a limpeza (DELETE): atómico.
+# Com mais de 1 o carregamento NÃO é atómico: a limpeza é confirmada antes de inserir (uma falha deixa
+# order_items vazia) e cada ligação faz o seu commit, uma a uma (uma falha a meio deixa-a carregada em parte).
+INSERT_WORKERS: int = 1
+
+# Nº máximo de chaves (encomendas x produtos) sorteadas de uma vez na amostragem vetorizada.
+# 2 000 000 de float64 ~ 16 MB por bloco de encomendas.
+SAMPLING_CHUNK_CELLS: int = 2_000_000
+
+# Nº de threads a amostrar blocos de encomendas em paralelo (o NumPy liberta o GIL no sorteio e nas ordenações).
+# Cada bloco tem o seu gerador, derivado da seed, por isso o resultado não depende deste valor.
+GENERATION_WORKERS: int = min(4, os.cpu_count() or 1)
+
+# Nº máximo de blocos de linhas gerados à espera de serem enviados (fila entre a thread de geração e a de inserção).
+PIPELINE_QUEUE_SIZE: int = 4
+
+# Durante o carregamento desliga, na sessão, unique_checks e foreign_key_checks (restaurados no fim).
+# Seguro aqui: order_id e product_id vêm das próprias tabelas orders/products e cada encomenda não repete produtos.
+# Se True, não escreve o carregamento no binlog: sql_log_bin = 0 logo ao abrir a ligação, antes de qualquer
+# transação (requer privilégios; ignorado se falhar), reposto depois do commit.
+BULK_LOAD_SKIP_BINLOG: bool = True
+
+# Carregar os items com LOAD DATA LOCAL INFILE (requer local_infile=ON no servidor).
+# Se o servidor recusar, o script volta automaticamente ao INSERT multi-linha.
+USE_LOAD_DATA_INFILE: bool = True
+
 # ------------------------------------------------------------------------------------------------------------------------------------
 # DATABASE
 # ------------------------------------------------------------------------------------------------------------------------------------
 
-def get_connection() -> "mysql.connector.connection.MySQLConnection":
-    """Abre ligação MySQL com as configs em DB_CONFIG."""
-    return mysql.connector.connect(use_pure=True, **DB_CONFIG)
+def get_connection() -> "mysql.connector.abstracts.MySQLConnectionAbstract":
+    """
+    Abre ligação MySQL com as configs em DB_CONFIG.
+    Usa a extensão C do conector (protocolo e escaping em C); se não estiver instalada, usa a implementação pura em Python.
+    """
+    try:
+        return mysql.connector.connect(use_pure=False, **DB_CONFIG)
+    except ImportError:
+        return mysql.connector.connect(use_pure=True, **DB_CONFIG)
+
+
+def get_connection_pool(size: int) -> "mysql.connector.pooling.MySQLConnectionPool":
+    """Cria um pool de `size` ligações MySQL com as configs em DB_CONFIG (para as threads de inserção), com extensão C se existir."""
+    try:
+        return mysql.connector.pooling.MySQLConnectionPool(
+            pool_name="order_items", pool_size=size, use_pure=False, **DB_CONFIG
+        )
+    except ImportError:
+        return mysql.connector.pooling.MySQLConnectionPool(
+            pool_name="order_items", pool_size=size, use_pure=True, **DB_CONFIG
+        )
 
 # ------------------------------------------------------------------------------------------------------------------------------------
 # DATA MODEL
 # ------------------------------------------------------------------------------------------------------------------------------------
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Product:
     product_id: int
-    price: Decimal
+    price_cents: int   # preço em cêntimos (DECIMAL(12,2) * 100), para não arrastar Decimal pelo pipeline
     category_id: int
 
+# Linhas de order_items em colunas (SoA), arrays int64 do mesmo comprimento:
+# (order_id, product_id, quantity, unit_price em cêntimos)
+ItemColumns = tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+
 # ------------------------------------------------------------------------------------------------------------------------------------
 # FETCHERS
 # ------------------------------------------------------------------------------------------------------------------------------------
 
-def fetch_orders(cur: "mysql.connector.cursor.MySQLCursor") -> list[int]:
-    """Lê todos os order_id ordenados por data e id."""
+def fetch_orders(cur: "mysql.connector.cursor.MySQLCursor") -> np.ndarray:
+    """
+    Lê todos os order_id ordenados por data e id, diretamente para um array int64.
+    O cursor (não bufferizado) é consumido linha a linha, sem materializar a lista de tuplos do fetchall().
+    """
     cur.execute("SELECT o.order_id FROM orders o ORDER BY o.order_date ASC, o.order_id ASC")
-    rows = cur.fetchall()  # [(id,), ...]
-    if not rows:
+    order_ids = np.fromiter((r[0] for r in cur), dtype=np.int64)
+    if not len(order_ids):
         raise RuntimeError("A tabela 'orders' está vazia — insere encomendas primeiro.")
-    return [int(r[0]) for r in rows]
+    return order_ids
 
 
 def fetch_products(cur: "mysql.connector.cursor.MySQLCursor") -> tuple[dict[int, Product], dict[int, str]]:
     """
     Lê produtos + categorias e devolve:
-      - products: {product_id -> Product}
+      - products: {product_id -> Product} (preço já convertido em cêntimos inteiros pelo MySQL)
       - category_names: {category_id -> category_name}
     """
     cur.execute(
         """
-        SELECT p.product_id, p.price, c.category_id, c.name
+        SELECT p.product_id, CAST(p.price * 100 AS SIGNED) AS price_cents, c.category_id, c.name
         FROM products p
         JOIN product_categories c ON p.category_id = c.category_id
         ORDER BY p.product_id
         """
     )
-    rows = cur.fetchall()
-    if not rows:
-        raise RuntimeError("There are no products with associated category.")
-
+    # uma só passagem pelo cursor (não bufferizado), sem fetchall() intermédio
     products: dict[int, Product] = {}
     category_names: dict[int, str] = {}
-    for pid, price, cat_id, cat_name in rows:
-        products[int(pid)] = Product(int(pid), Decimal(str(price)), int(cat_id))
+    for pid, price_cents, cat_id, cat_name in cur:
+        products[int(pid)] = Product(int(pid), int(price_cents), int(cat_id))
         category_names[int(cat_id)] = str(cat_name)
+    if not products:
+        raise RuntimeError("There are no products with associated category.")
     return products, category_names
 
 # ------------------------------------------------------------------------------------------------------------------------------------
@@ -142,77 +262,209 @@ def product_weights(
     products: Mapping[int, Product],
     category_names: Mapping[int, str],
     default_weight: float = 1.0,
-) -> dict[int, float]:
-    """
-    Mapeia product_id -> peso com base no nome da categoria e CATEGORY_WEIGHTS.
+) -> np.ndarray:
     """
-    weights: dict[int, float] = {}
-    for p in products.values():
-        cat_name = category_names.get(p.category_id)
-        w = CATEGORY_WEIGHTS.get(cat_name, default_weight)
-        weights[p.product_id] = float(w)
-    return weights
+    Devolve o peso de cada produto (pela ordem de `products`) com base no nome da categoria e CATEGORY_WEIGHTS.
 
-
-def choose_weighted_key(rng: random.Random, weights: Mapping[int, float]) -> int:
-    """
-    Escolhe uma chave (int) segundo pesos arbitrários (não precisam de normalizar).
+    Os pesos são resolvidos uma vez por categoria (array indexado pela posição do category_id ordenado);
+    o peso de cada produto é depois um único gather NumPy, sem lookups em dicionários por produto.
     """
-    if not weights:
-        raise ValueError("Empty weights.")
-    keys = list(weights.keys())
-    vals = list(weights.values())
-    return rng.choices(keys, weights=vals, k=1)[0]
+    cat_ids = np.array(sorted(category_names), dtype=np.int64)
+    cat_w = np.array([CATEGORY_WEIGHTS.get(category_names[cid], default_weight) for cid in cat_ids.tolist()], dtype=np.float64)
+    product_cats = np.fromiter((p.category_id for p in products.values()), dtype=np.int64, count=len(products))
+    return cat_w[np.searchsorted(cat_ids, product_cats)]
 
 
-def sample_unique_products_weighted(
-    rng: random.Random,
-    candidate_ids: Sequence[int],
-    weights_map: Mapping[int, float],
-    k: int,
-) -> list[int]:
+def product_arrays(
+    products: Mapping[int, Product],
+    weights: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
     """
-    Amostra até k produtos distintos com pesos (sem reposição).
-    Implementação O(k) com técnica swap-pop para evitar deslocações O(n).
+    Constrói uma única vez os arrays alinhados (product_id, peso, preço em cêntimos) usados pela amostragem.
+    Ficam só de leitura: são partilhados por todas as encomendas e nunca copiados nem alterados.
     """
-    if k <= 0 or not candidate_ids:
-        return []
+    n = len(products)
+    pids = np.fromiter(products.keys(), dtype=np.int64, count=n)
+    weights = np.array(weights, dtype=np.float64)
+    prices_cents = np.fromiter((p.price_cents for p in products.values()), dtype=np.int64, count=n)
 
-    # arrays locais (mutáveis)
-    pool = list(candidate_ids)
-    weights = [float(weights_map.get(pid, 1.0)) for pid in pool]
+    # validação única (em vez de verificar a soma dos pesos dentro do loop de amostragem):
+    # as chaves E/w só fazem sentido com pesos estritamente positivos
+    if n and weights.min() <= 0:
+        raise ValueError("Product weights must be strictly positive.")
 
-    k = min(k, len(pool))
-    chosen: list[int] = []
+    for arr in (pids, weights, prices_cents):
+        arr.setflags(write=False)
+    return pids, weights, prices_cents
 
-    for _ in range(k):
-        # escolher índice ponderado
-        idx = rng.choices(range(len(pool)), weights=weights, k=1)[0]
-        chosen.append(pool[idx])
 
-        # swap com o último e pop (para O(1))
-        last_index = len(pool) - 1
-        pool[idx], pool[last_index] = pool[last_index], pool[idx]
-        weights[idx], weights[last_index] = weights[last_index], weights[idx]
+def draw_weighted_keys(rng: np.random.Generator, table: tuple[np.ndarray, np.ndarray], size: int) -> np.ndarray:
+    """
+    Sorteia `size` chaves (int) de uma só vez a partir de uma tabela pré-calculada (ver `cumulative_table`):
+    inversão da distribuição acumulada por bisseção, sem reconstruir nem validar pesos em cada chamada.
+    """
+    keys, cdf = table
+    return keys[np.searchsorted(cdf, rng.random(size), side="right")]
 
-        pool.pop()
-        weights.pop()
 
-        # proteção (opcional): se os pesos remanescentes somarem 0, parar
-        if weights and sum(weights) <= 0:
-            break
+def sample_unique_products_weighted(
+    rng: np.random.Generator,
+    cart_sizes: np.ndarray,
+    weights: np.ndarray,
+) -> np.ndarray:
+    """
+    Amostra, para um bloco de encomendas, até cart_sizes[i] produtos distintos com pesos (sem reposição).
 
-    return chosen
+    Algoritmo de Efraimidis–Spirakis (A-Res) na forma exponencial: cada par (encomenda, produto) recebe
+    a chave E/w, com E ~ Exp(1) (equivalente a -log(U)/w, mas sorteado diretamente, sem o log), e cada
+    encomenda fica com os produtos de menor chave. Tudo em NumPy sobre a matriz de chaves do bloco
+    (argpartition + ordenação só dos kmax melhores), sem loop Python por encomenda.
+
+    Returns:
+        Índices (posições em `weights`) dos produtos escolhidos, concatenados pela ordem das encomendas;
+        a encomenda i contribui com min(cart_sizes[i], n) índices.
+    """
+    n = len(weights)
+    sizes = np.minimum(cart_sizes, n)
+    kmax = int(sizes.max(initial=0))
+    if kmax == 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+
+    keys = rng.standard_exponential((len(cart_sizes), n)) / weights
+
+    # os kmax produtos de menor chave por encomenda, ordenados por chave crescente
+    top = np.argpartition(keys, kmax - 1, axis=1)[:, :kmax]
+    top_keys = np.take_along_axis(keys, top, axis=1)
+    top = np.take_along_axis(top, np.argsort(top_keys, axis=1), axis=1)
+
+    # cada encomenda fica só com os primeiros cart_size (o achatamento preserva a ordem das encomendas)
+    mask = np.arange(kmax) < sizes[:, None]
+    return top[mask]
+
+
+def iterate_item_columns(
+    seed_seq: np.random.SeedSequence,
+    order_ids: np.ndarray,
+    cart_sizes: np.ndarray,
+    qtys: np.ndarray,
+    pids: np.ndarray,
+    weights: np.ndarray,
+    prices_cents: np.ndarray,
+    workers: int,
+) -> Iterator[ItemColumns]:
+    """
+    Gera as linhas das encomendas em colunas (SoA), um bloco de encomendas de cada vez (limitado por
+    SAMPLING_CHUNK_CELLS). `qtys` traz uma quantidade por linha (sorteio em bloco).
+
+    Os blocos são independentes: cada um é amostrado numa thread (até `workers` em curso) com o seu próprio
+    gerador, filho de `seed_seq`, e a posição das suas linhas vem do prefixo acumulado dos tamanhos das
+    encomendas. Os blocos saem pela ordem das encomendas e o resultado é o mesmo para qualquer nº de threads.
+    Dentro do bloco, as linhas saem ordenadas por (order_id, product_id), para que as inserções nos índices
+    sejam sequenciais.
+    """
+    sizes = np.minimum(cart_sizes, len(pids))
+    offsets = np.concatenate(([0], np.cumsum(sizes)))
+    chunk = max(1, SAMPLING_CHUNK_CELLS // max(1, len(pids)))
+    starts = range(0, len(order_ids), chunk)
+
+    def build(start: int, chunk_seed: np.random.SeedSequence) -> ItemColumns:
+        stop = min(start + chunk, len(order_ids))
+        idx = sample_unique_products_weighted(np.random.default_rng(chunk_seed), cart_sizes[start:stop], weights)
+        product_col = np.take(pids, idx)
+        price_col = np.take(prices_cents, idx)
+        order_col = np.repeat(order_ids[start:stop], sizes[start:stop])
+
+        order = np.lexsort((product_col, order_col))
+        return order_col[order], product_col[order], qtys[offsets[start]:offsets[stop]][order], price_col[order]
+
+    # janela limitada de blocos em curso (não se sorteia tudo de uma vez)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        pending: deque = deque()
+        for start, chunk_seed in zip(starts, seed_seq.spawn(len(starts))):
+            pending.append(executor.submit(build, start, chunk_seed))
+            if len(pending) >= max(1, workers):
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
 
 # ------------------------------------------------------------------------------------------------------------------------------------
 # PERSISTÊNCIA
 # ------------------------------------------------------------------------------------------------------------------------------------
 
-SQL_INSERT = """
+# INSERT multi-linha: o prefixo é seguido de um grupo de placeholders por linha do batch.
+# Com BATCH_SIZE = 20 000 o statement fica na ordem de 1 MB (abaixo do max_allowed_packet por omissão, 64 MB).
+SQL_INSERT_PREFIX = """
 INSERT INTO order_items (order_id, product_id, quantity, unit_price)
-VALUES (%s, %s, %s, %s)
+VALUES """
+# O preço viaja em cêntimos (inteiro) e é convertido para DECIMAL no servidor (divisão exata).
+SQL_ROW_PLACEHOLDER = "(%s, %s, %s, %s / 100)"
+
+# Carregamento em bloco a partir de um ficheiro TSV (o caminho é passado como parâmetro).
+# Só há inteiros, por isso não é preciso escapar campos; o preço (cêntimos) é convertido no SET.
+SQL_LOAD_DATA = """
+LOAD DATA LOCAL INFILE %s
+INTO TABLE order_items
+FIELDS TERMINATED BY '\\t'
+LINES TERMINATED BY '\\n'
+(order_id, product_id, quantity, @unit_price_cents)
+SET unit_price = @unit_price_cents / 100
 """
 
+# Formato de uma linha do TSV (4 inteiros)
+TSV_ROW_FORMAT = "%d\t%d\t%d\t%d\n"
+
+# Erros MySQL que indicam que o LOAD DATA LOCAL está desativado (cliente ou servidor).
+LOAD_DATA_DISABLED_ERRNOS = {1148, 2068, 3948}
+
+@contextmanager
+def bulk_load_session(cur: "mysql.connector.cursor.MySQLCursor") -> Iterator[None]:
+    """
+    Relaxa as verificações da sessão MySQL durante o carregamento e repõe os valores anteriores no fim
+    (mesmo em caso de erro). O sql_log_bin é tratado à parte (disable_session_binlog), fora da transação.
+    """
+    cur.execute("SELECT @@SESSION.unique_checks, @@SESSION.foreign_key_checks")
+    unique_checks, fk_checks = cur.fetchone()
+    cur.execute("SET SESSION unique_checks = 0, foreign_key_checks = 0")
+
+    try:
+        yield
+    finally:
+        cur.execute(
+            "SET SESSION unique_checks = %s, foreign_key_checks = %s",
+            (int(unique_checks), int(fk_checks)),
+        )
+
+
+def disable_session_binlog(conn: "mysql.connector.abstracts.MySQLConnectionAbstract") -> int | None:
+    """
+    Desliga o binary log da sessão (sql_log_bin = 0) se BULK_LOAD_SKIP_BINLOG, e devolve o valor anterior
+    (None se não foi alterado). O MySQL recusa mudar sql_log_bin dentro de uma transação (erro 1694), por isso
+    tem de ser chamada antes do primeiro statement da sessão. Exige privilégios; sem eles o carregamento
+    continua com binlog.
+    """
+    if not BULK_LOAD_SKIP_BINLOG:
+        return None
+    with conn.cursor() as cur:
+        cur.execute("SELECT @@SESSION.sql_log_bin")
+        (log_bin,) = cur.fetchone()
+        try:
+            cur.execute("SET SESSION sql_log_bin = 0")
+        except mysql.connector.Error as e:
+            print(f"[info] Binlog mantido ativo neste carregamento ({e.msg}).")
+            return None
+    return int(log_bin)
+
+
+def restore_session_binlog(conn: "mysql.connector.abstracts.MySQLConnectionAbstract", log_bin: int | None) -> None:
+    """
+    Repõe o sql_log_bin anterior (ver disable_session_binlog). Só depois do commit, fora da transação;
+    em caso de erro não é preciso: a ligação é fechada e o valor da sessão perde-se com ela.
+    """
+    if log_bin is not None:
+        with conn.cursor() as cur:
+            cur.execute("SET SESSION sql_log_bin = %s", (log_bin,))
+
+
 def clear_existing_order_items(cur: "mysql.connector.cursor.MySQLCursor") -> None:
     """Limpa items de encomendas existentes (idempotência)."""
     cur.execute(
@@ -223,104 +475,209 @@ def clear_existing_order_items(cur: "mysql.connector.cursor.MySQLCursor") -> Non
         """
     )
 
-def insert_items_in_batches(
-    conn: "mysql.connector.connection.MySQLConnection",
-    rows: Sequence[tuple[int, int, int, Decimal]],
+def insert_batch(cur: "mysql.connector.cursor.MySQLCursor", batch: np.ndarray) -> int:
+    """
+    Insere um batch (array (n, 4) int64, uma linha por item) num único INSERT ... VALUES (...),(...),...
+    (1 round-trip); devolve nº de linhas.
+    """
+    if not len(batch):
+        return 0
+    sql = SQL_INSERT_PREFIX + ",".join([SQL_ROW_PLACEHOLDER] * len(batch))
+    cur.execute(sql, batch.ravel().tolist())
+    return len(batch)
+
+
+def load_batch(cur: "mysql.connector.cursor.MySQLCursor", batch: np.ndarray) -> int:
+    """Carrega um batch (array (n, 4) int64) com LOAD DATA LOCAL INFILE, através de um ficheiro TSV temporário."""
+    if not len(batch):
+        return 0
+
+    # O conector lê o ficheiro a partir do disco (não aceita um buffer em memória),
+    # por isso o TSV é escrito num ficheiro temporário
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", newline="\n", suffix=".tsv", delete=False) as f:
+        # um único % sobre o batch inteiro (bem mais rápido do que np.savetxt ou formatar linha a linha)
+        f.write((TSV_ROW_FORMAT * len(batch)) % tuple(batch.ravel().tolist()))
+
+    try:
+        cur.execute(SQL_LOAD_DATA, (f.name,))
+    finally:
+        os.remove(f.name)
+    return len(batch)
+
+
+def write_batch(
+    cur: "mysql.connector.cursor.MySQLCursor",
+    batch: np.ndarray,
+    use_load_data: bool,
+) -> tuple[int, bool]:
+    """
+    Envia um batch por LOAD DATA LOCAL INFILE (se ativo) ou INSERT multi-linha.
+    Devolve (nº de linhas, use_load_data): se o servidor recusar o LOAD DATA, passa a INSERT daí em diante.
+    """
+    if use_load_data:
+        try:
+            return load_batch(cur, batch), True
+        except mysql.connector.Error as e:
+            if e.errno not in LOAD_DATA_DISABLED_ERRNOS:
+                raise
+            print(f"[info] LOAD DATA LOCAL INFILE indisponível ({e.msg}); a usar INSERT multi-linha.")
+    return insert_batch(cur, batch), False
+
+
+def write_columns_in_batches(
+    cur: "mysql.connector.cursor.MySQLCursor",
+    chunks: Iterable[ItemColumns],
     batch_size: int,
 ) -> tuple[int, int]:
-    """Insere rows por batches; devolve (total, num_batches)."""
+    """
+    Envia blocos de colunas por batches: cada batch é uma fatia das 4 colunas, copiada para um bloco (n, 4)
+    pré-alocado e reutilizado em todos os batches (só cresce se aparecer um bloco maior).
+    Devolve (total, num_batches).
+    """
     total, batches = 0, 0
-    if not rows:
-        return total, batches
-
-    with conn.cursor() as cur:
-        buf: list[tuple[int, int, int, Decimal]] = []
-        for rec in rows:
-            buf.append(rec)
-            if batch_size and len(buf) >= batch_size:
-                cur.executemany(SQL_INSERT, buf)
-                conn.commit()
-                total += len(buf)
-                batches += 1
-                buf.clear()
-
-        if buf:
-            cur.executemany(SQL_INSERT, buf)
-            conn.commit()
-            total += len(buf)
+    use_load_data = USE_LOAD_DATA_INFILE
+    block = np.empty((0, 4), dtype=np.int64)
+    for columns in chunks:
+        n = len(columns[0])
+        step = batch_size or n
+        if len(block) < min(step, n):
+            block = np.empty((min(step, n), len(columns)), dtype=np.int64)
+        for start in range(0, n, step):
+            end = min(start + step, n)
+            batch = block[:end - start]
+            for j, col in enumerate(columns):
+                batch[:, j] = col[start:end]
+            written, use_load_data = write_batch(cur, batch, use_load_data)
+            total += written
             batches += 1
-
     return total, batches
 
+
+def insert_columns_in_parallel(
+    pool: "mysql.connector.pooling.MySQLConnectionPool",
+    chunks: Iterable[ItemColumns],
+    batch_size: int,
+    workers: int,
+) -> tuple[int, int]:
+    """
+    Envia os blocos de colunas em `workers` threads, cada uma com a sua ligação do pool (o conector liberta
+    o GIL enquanto espera pela rede). As threads vão retirando blocos de `chunks` (partilhado, com lock)
+    até se esgotarem. Devolve (total, num_batches).
+
+    NÃO é atómico: cada ligação tem a sua transação. Os commits só começam depois de todos os blocos terem
+    sido enviados, e uma falha no envio faz rollback em todas as ligações; mas os commits são feitos um a um,
+    por isso uma falha a meio desse ciclo deixa confirmadas as ligações anteriores.
+
+    O sql_log_bin de cada ligação é desligado logo ao retirá-la do pool (ainda sem transação aberta) e reposto
+    só depois do commit; em caso de erro, o pool repõe a sessão quando a ligação lhe é devolvida.
+    """
+    source = iter(chunks)
+    lock = threading.Lock()
+    failed = threading.Event()
+    conns = [pool.get_connection() for _ in range(workers)]
+    log_bins = [disable_session_binlog(c) for c in conns]
+
+    def take() -> Iterator[ItemColumns]:
+        while not failed.is_set():
+            with lock:
+                columns = next(source, None)
+            if columns is None:
+                return
+            yield columns
+
+    def work(conn) -> tuple[int, int]:
+        conn.autocommit = False
+        try:
+            with conn.cursor() as cur, bulk_load_session(cur):
+                return write_columns_in_batches(cur, take(), batch_size)
+        except BaseException:
+            failed.set()
+            raise
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(work, c) for c in conns]
+            results = [f.result() for f in futures]
+        for c in conns:
+            c.commit()
+        for c, log_bin in zip(conns, log_bins):
+            restore_session_binlog(c, log_bin)
+    except BaseException:
+        for c in conns:
+            c.rollback()
+        raise
+    finally:
+        for c in conns:
+            c.close()  # devolve a ligação ao pool
+
+    return sum(r[0] for r in results), sum(r[1] for r in results)
+
+
 # ------------------------------------------------------------------------------------------------------------------------------------
 # ORQUESTRAÇÃO
 # ------------------------------------------------------------------------------------------------------------------------------------
 
 def run(seed: int = SEED) -> None:
-    rng = random.Random(seed)
+    nprng = np.random.default_rng(seed)
     print(
         f"🔌 A ligar à BD '{DB_CONFIG['database']}' como '{DB_CONFIG['user']}' em '{DB_CONFIG['host']}'..."
     )
 
     # ligação manual (para controlar rollback)
     conn = get_connection()
+    # antes do primeiro statement: o MySQL não deixa mudar sql_log_bin dentro de uma transação
+    log_bin = disable_session_binlog(conn)
     conn.autocommit = False
 
     try:
-        with conn.cursor() as cur:
+        # cursor não bufferizado: os fetchers consomem as linhas à medida que chegam do servidor
+        with conn.cursor(buffered=False) as cur:
             # fetch
             order_ids = fetch_orders(cur)
             products, category_names = fetch_products(cur)
 
             # pesos por produto
-            weights_map = product_weights(products, category_names)
-
-            # limpar items (idempotência)
-            if CLEAR_EXISTING_ORDER_ITEMS:
-                clear_existing_order_items(cur)
-                conn.commit()
-
-            # preparar buffers
-            product_ids = list(products.keys())
-            buffer: list[tuple[int, int, int, Decimal]] = []
-            total_items = 0
-            batches = 0
-
-            start = time.perf_counter()
-
-            # gerar items para cada encomenda
-            for order_id in order_ids:
-                # nº linhas desta encomenda
-                cart_size = choose_weighted_key(rng, CART_SIZE_WEIGHTS)
-
-                # amostra de produtos distintos
-                chosen_products = sample_unique_products_weighted(
-                    rng, product_ids, weights_map, cart_size
+            weights = product_weights(products, category_names)
+
+            # limpeza + carregamento numa única transação (um só commit/fsync no fim),
+            # com unique/foreign key checks desligados na sessão
+            with bulk_load_session(cur):
+                # limpar items (idempotência)
+                if CLEAR_EXISTING_ORDER_ITEMS:
+                    clear_existing_order_items(cur)
+
+                # arrays de candidatos, pesos e preços (construídos uma vez, só de leitura)
+                pids_np, w_np, prices_np = product_arrays(products, weights)
+
+                start = time.perf_counter()
+
+                # nº de linhas de todas as encomendas e quantidades de todas as linhas, sorteados em bloco
+                cart_sizes = draw_weighted_keys(nprng, CART_SIZE_TABLE, len(order_ids))
+                qtys = np.maximum(draw_weighted_keys(nprng, QTY_TABLE, int(cart_sizes.sum())), 1)
+
+                # gerar items por blocos de encomendas (amostragem vetorizada, direto para colunas) numa
+                # thread produtora, enquanto os blocos anteriores são enviados ao MySQL
+                pipeline = iterate_in_background(
+                    iterate_item_columns(
+                        np.random.SeedSequence(seed), order_ids, cart_sizes, qtys, pids_np, w_np, prices_np,
+                        GENERATION_WORKERS,
+                    ),
+                    PIPELINE_QUEUE_SIZE,
                 )
 
-                # criar linhas (qty ponderado + preço do produto)
-                for pid in chosen_products:
-                    qty = max(1, choose_weighted_key(rng, QTY_WEIGHTS))
-                    price = products[pid].price
-                    buffer.append((order_id, pid, qty, price))
-
-                    # flush por batch
-                    if BATCH_SIZE and len(buffer) >= BATCH_SIZE:
-                        cur.executemany(SQL_INSERT, buffer)
-                        conn.commit()
-                        total_items += len(buffer)
-                        batches += 1
-                        buffer.clear()
-
-            # flush final
-            if buffer:
-                cur.executemany(SQL_INSERT, buffer)
-                conn.commit()
-                total_items += len(buffer)
-                batches += 1
+                if INSERT_WORKERS > 1:
+                    # as outras ligações ficariam bloqueadas nos locks do DELETE: confirmar a limpeza primeiro
+                    conn.commit()
+                    pool = get_connection_pool(INSERT_WORKERS)
+                    total_items, batches = insert_columns_in_parallel(pool, pipeline, BATCH_SIZE, INSERT_WORKERS)
+                else:
+                    total_items, batches = write_columns_in_batches(cur, pipeline, BATCH_SIZE)
+
+            conn.commit()
+            restore_session_binlog(conn, log_bin)
 
             elapsed = time.perf_counter() - start
-            avg_items = (total_items / len(order_ids)) if order_ids else 0.0
+            avg_items = (total_items / len(order_ids)) if len(order_ids) else 0.0
 
             print(f"✅ Inseridas {total_items} linhas em order_items para {len(order_ids)} encomendas em {batches} batch(es).")
             print(f"🧺 Linhas por encomenda (média): {avg_items:.2f}")
@@ -4,12 +4,16 @@
 
 import os 
 import random
+import tempfile
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 import mysql.connector   
-from typing import Mapping, Sequence, TypeVar, Union
-from collections import Counter
+from typing import Iterator, Mapping, Sequence, TypeVar, Union
+import numpy as np
 from dotenv import load_dotenv                                          
 load_dotenv() 
 
@@ -39,6 +43,45 @@ def normalize_distribution(dist: Mapping[K, Union[int, float]]) -> dict[K, float
         raise ValueError("Distribution must have positive weights.")
     return {k: float(v) / total for k, v in dist.items()}
 
+
+def build_alias_table(weights: Sequence[float]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Tabela de alias (método de Vose) para uma distribuição discreta fixa: devolve (prob, alias).
+    Cada sorteio custa O(1): escolhe-se uma coluna i uniforme e fica-se com i (probabilidade prob[i])
+    ou com alias[i]. Construída uma vez (O(k)) e só de leitura.
+    """
+    w = np.asarray(weights, dtype=np.float64)
+    if not len(w) or w.min() < 0 or w.sum() <= 0:
+        raise ValueError("Alias table weights must be non-negative with a positive sum.")
+    k = len(w)
+    scaled = (w * k / w.sum()).tolist()
+    prob = np.ones(k)
+    alias = np.arange(k, dtype=np.int64)
+
+    small = [i for i, x in enumerate(scaled) if x < 1.0]
+    large = [i for i, x in enumerate(scaled) if x >= 1.0]
+    while small and large:
+        s, l = small.pop(), large.pop()
+        prob[s], alias[s] = scaled[s], l
+        scaled[l] += scaled[s] - 1.0
+        (small if scaled[l] < 1.0 else large).append(l)
+    # o que sobrar (só por arredondamentos) fica com prob 1
+
+    for arr in (prob, alias):
+        arr.setflags(write=False)
+    return prob, alias
+
+
+def draw_alias(table: tuple[np.ndarray, np.ndarray], u: np.ndarray) -> np.ndarray:
+    """
+    Sorteia índices de uma tabela de alias a partir de uniformes em [0, 1): a parte inteira de u*k
+    escolhe a coluna e a parte fracionária decide entre a coluna e o seu alias.
+    """
+    prob, alias = table
+    scaled = u * len(prob)
+    idx = scaled.astype(np.int64)
+    return np.where(scaled - idx < prob[idx], idx, alias[idx])
+
 # ------------------------------------------------------------------------------------------------------------------------------------------------------
 # CONFIGS
 # -------------------------------------------------------------------------------------------------------------------------------------------------------
@@ -50,7 +93,8 @@ DB_CONFIG = {
     "user": os.getenv("DB_USER", "root"),                                     
     "password": os.getenv("DB_PASS", ""),                                     
     "database": os.getenv("DB_NAME", "ecommerce_db"),                      
-    "charset": "utf8mb4"                                                      
+    "charset": "utf8mb4",
+    "allow_local_infile": True,  # necessário para o LOAD DATA LOCAL INFILE
 }
 
 # Semente fixa para tornar o aleatório reprodutível (mesmo output entre execuções).
@@ -68,26 +112,61 @@ ORDERS_WEIGHTS = normalize_distribution(ORDERS_PER_CUSTOMER)
 ORDERS_START = datetime(2023, 1, 1)
 ORDERS_END_EXCL = datetime(2025, 8, 1)  # exclusivo -> pára a 2025-07-31 23:59:59
 
+# Sazonalidade das encomendas: peso de cada mês (escolha do mês) e boosts por dia dentro do mês.
+ORDER_MONTH_WEIGHT = {
+    1:0.95, 2:0.95, 3:1.00, 4:1.05, 5:1.10,
+    6:0.95, 7:0.85, 8:0.90, 9:1.10, 10:1.25,
+    11:1.45, 12:1.80
+}
+ORDER_WEEKEND_BOOST = 1.25        # Sábado/Domingo
+ORDER_BLACK_FRIDAY_BOOST = 2.5    # sexta-feira entre 22 e 28 de novembro
+ORDER_CHRISTMAS_BOOST = 1.5       # 20 a 24 de dezembro
+
+# Pesos por hora do dia (pico 17–21h) e respetiva tabela de alias (construída uma vez, só de leitura).
+ORDER_HOUR_WEIGHTS = [2 if 17 <= h <= 21 else 1 for h in range(24)]
+ORDER_HOUR_ALIAS = build_alias_table(ORDER_HOUR_WEIGHTS)
+
+# Geração das datas por blocos de encomendas, em paralelo (o NumPy liberta o GIL nos sorteios e no searchsorted).
+# Cada bloco tem o seu gerador, derivado da seed, por isso o resultado não depende do nº de threads.
+GENERATION_CHUNK_SIZE = 100_000
+GENERATION_WORKERS = min(4, os.cpu_count() or 1)
+
 # Pesos para estado final da encomenda
 DELIVERED_WEIGHT = 85
 CANCELLED_WEIGHT = 15
 
-# Inserção por batches (para não encher buffers do connector/servidor)
-BATCH_SIZE = 10_000
+# Inserção por batches (para não encher buffers do connector/servidor).
+# Todos os batches vão na mesma transação: um só commit (e flush do redo log) no fim do carregamento.
+BATCH_SIZE = 50_000
+
+# Durante o carregamento desliga, na sessão, unique_checks e foreign_key_checks (restaurados no fim).
+# Seguro aqui: customer_id e order_status_id vêm das próprias tabelas customers/order_status.
+# Se True, não escreve o carregamento no binlog: sql_log_bin = 0 logo ao abrir a ligação, antes de qualquer
+# transação (requer privilégios; ignorado se falhar), reposto depois do commit.
+BULK_LOAD_SKIP_BINLOG: bool = True
+
+# Carregar as encomendas com LOAD DATA LOCAL INFILE (requer local_infile=ON no servidor).
+# Se o servidor recusar, o script volta automaticamente ao INSERT multi-linha.
+USE_LOAD_DATA_INFILE: bool = True
 
 # ------------------------------------------------------------------------------------------------------------------------------------------------------------
 # DATABASE
 # ------------------------------------------------------------------------------------------------------------------------------------------------------------
 
-def get_connection() -> "mysql.connector.connection.MySQLConnection":
+def get_connection() -> "mysql.connector.abstracts.MySQLConnectionAbstract":
     # Função que tem o objetivo abrir uma ligação ao MySQL usando as definições do dicionário DB_CONFIG.
     # Não recebe argumentos.
-    # O tipo de retorno (annotation) indica que devolve um objeto de ligação MySQL (MySQLConnection).
+    # O tipo de retorno (annotation) indica que devolve um objeto de ligação MySQL (MySQLConnection ou CMySQLConnection).
     
     # Cria e devolve uma conexão ao MySQL.
     # mysql.connector.connect(...) é a função do conector oficial que estabelece ligação.
     # **DB_CONFIG faz o "unpacking" do dicionário de configuração (host, port, user, password, database, charset).
-    return mysql.connector.connect(use_pure=True, **DB_CONFIG) 
+    # use_pure=False usa a extensão C do conector (protocolo e escaping em C);
+    # se não estiver instalada (ImportError), usa a implementação pura em Python.
+    try:
+        return mysql.connector.connect(use_pure=False, **DB_CONFIG)
+    except ImportError:
+        return mysql.connector.connect(use_pure=True, **DB_CONFIG)
 
 # ------------------------------------------------------------------------------------------------------------------------------------------------------------
 # FETCHERS
@@ -99,24 +178,24 @@ def fetch_customer_ids(cur: "mysql.connector.cursor.MySQLCursor") -> list[int]:
     # Recebe como argumento um cursor MySQL já ligado à base de dados.
     # Retorna uma lista de inteiros (IDs de clientes)
     
-    cur.execute("SELECT customer_id FROM customers ORDER BY customer_id ASC")
-    # Com o cursor, é executada uma query SQL.
+    cur.execute("SELECT customer_id FROM customers")
+    # Com o cursor, é executada uma query SQL (sem ORDER BY: a ordenação é feita em Python, no fim).
     
-    rows = cur.fetchall()
-    # O método fetchall() vai buscar todas as linhas devolvidas pela query
-    # O resultado é uma lista de tuplos
-    # rows = [(1,), (2,), (3,), ...]
+    customer_ids = sorted(int(r[0]) for r in cur)
+    # Percorre o cursor (não bufferizado) linha a linha, sem a lista intermédia de tuplos do fetchall().
+    # Cada linha é um tuplo, ex.: (1,), (2,), (3,), ...
+    # Extrai o primeiro elemento de cada tuplo (r[0]).
+    # Converte cada valor explicitamente para int (por segurança, caso venha como string ou Decimal).
+    # sorted() garante uma ordem determinística (as quotas são sorteadas por esta ordem), sem sort no servidor.
+    # Exemplo: [(1,), (2,), (3,)] → [1, 2, 3]
     
-    if not rows:
+    if not customer_ids:
     # Se a lista estiver vazia, significa que não existem clientes na tabela   
         
         raise RuntimeError("Customers table is empty.")
         # Nesse caso, interrompe o programa lançando uma exceção
     
-    return [int(r[0]) for r in rows]
-    # Usa list comprehension para extrair o primeiro elemento de cada tuplo (r[0]).
-    # Converte cada valor explicitamente para int (por segurança, caso venha como string ou Decimal).
-    # Exemplo: [(1,), (2,), (3,)] → [1, 2, 3]
+    return customer_ids
 
 
 
@@ -124,23 +203,24 @@ def fetch_customer_activation(cur: "mysql.connector.cursor.MySQLCursor") -> dict
     """
     Lê customer_id e created_at da tabela customers.
     """
-    cur.execute("SELECT customer_id, created_at FROM customers ORDER BY customer_id ASC")
-    rows = cur.fetchall()  # [(cid, created_at), ...]
-    if not rows:
-        raise RuntimeError("Customers table is empty.")
+    cur.execute("SELECT customer_id, created_at FROM customers")
+    # dicionário construído diretamente do cursor (não bufferizado), sem fetchall() intermédio
     # created_at já vem como datetime (timezone do servidor; estás a forçar '+00:00' no SET time_zone)
-    return {int(cid): dt for cid, dt in rows}
+    activation = {int(cid): dt for cid, dt in cur}
+    if not activation:
+        raise RuntimeError("Customers table is empty.")
+    return activation
 
 
 
 def fetch_order_status_ids(cur: "mysql.connector.cursor.MySQLCursor") -> dict[str, int]:
     # Define a função fetch_order_status_ids, que recebe como argumento cur, um cursor do MySQL.
     
-    cur.execute("SELECT code, order_status_id FROM order_status ORDER BY order_status_id ASC")
+    cur.execute("SELECT code, order_status_id FROM order_status")
     # Com o cursor, é executada uma query SQL.
     
-    mapping: dict[str, int] = {code: int(sid) for code, sid in cur.fetchall()}
-    # fetchall() devolve uma lista de tuplos, ex.: [("delivered", 1), ("cancelled", 2), ("pending", 3)]
+    mapping: dict[str, int] = {code: int(sid) for code, sid in cur}
+    # O cursor devolve tuplos, ex.: ("delivered", 1), ("cancelled", 2), ("pending", 3)
     # A compreensão de dicionário cria um mapping code -> id (convertendo sid para int).
     # Exemplo: {"delivered": 1, "cancelled": 2, "pending": 3}
     
@@ -162,99 +242,171 @@ def fetch_order_status_ids(cur: "mysql.connector.cursor.MySQLCursor") -> dict[st
 # -----------------------------------------------------------------------------------------------------------------------------------------------------
 
 def build_customer_quotas(
-    customer_ids: Sequence[int],
-    buckets: Sequence[int],
-    probs: Sequence[float],
-    rng: random.Random,
-) -> dict[int, int]:
+    n_customers: int,
+    buckets: np.ndarray,
+    probs: np.ndarray,
+    rng_np: np.random.Generator,
+) -> np.ndarray:
     """
     Atribui a cada cliente um nº de encomendas, segundo distribuição discreta.
-    `buckets` = possíveis nºs (ex.: [0,1,2,3,4]); `probs` = pesos normalizados (mesmo comprimento).
+    `buckets` = possíveis nºs (ex.: [0,1,2,3,4]); `probs` = probabilidades (mesmo comprimento, soma 1).
+    Todas as quotas são sorteadas numa só chamada; a quota i pertence ao i-ésimo cliente.
     """
-    if not customer_ids:
-        return {}
-    if not buckets or not probs or len(buckets) != len(probs):
+    if not len(buckets) or len(buckets) != len(probs):
         raise ValueError("Buckets and probs must be non-empty and of identical length.")
-    return {cid: rng.choices(buckets, weights=probs, k=1)[0] for cid in customer_ids}
+    return rng_np.choice(buckets, size=n_customers, p=probs)
 
 
-def quotas_to_orders(quotas: Mapping[int, int]) -> list[int]:
-    # Define a função quotas_to_orders.
-    # Parâmetro quotas: dicionário (quotas) no formato {customer_id: nº_encomendas}.
-    # Output: lista de inteiros (IDs de cliente), onde cada cliente aparece repetido q vezes.
+def top_up_quotas(quotas: np.ndarray, deficit: int, max_quota: int, rng_np: np.random.Generator) -> None:
+    """
+    Acrescenta `deficit` encomendas às quotas (in-place), sem passar `max_quota` por cliente.
+
+    Cada cliente contribui com (max_quota - quota) "vagas"; sorteiam-se `deficit` vagas sem reposição,
+    pelo que um cliente recebe mais encomendas quanto mais margem tiver.
+    """
+    slots = np.repeat(np.arange(len(quotas)), max_quota - quotas)
+    if deficit > len(slots):
+        raise ValueError(f"Cannot add {deficit} orders: only {len(slots)} below the max of {max_quota} per customer.")
+    picked = rng_np.choice(slots, size=deficit, replace=False)
+    quotas += np.bincount(picked, minlength=len(quotas)).astype(quotas.dtype)
 
-    return [cid for cid, q in quotas.items() for _ in range(q)]
-    # Usa uma list comprehension com dois loops embutidos:
-    # 1º loop → percorre cada par (cid, q) do dicionário quotas.
-    #     - cid é o ID do cliente
-    #     - q é o número de encomendas atribuídas a esse cliente
-    # 2º loop → "for _ in range(q)" repete o cliente q vezes.
-    # Para cada repetição, devolve o cid.
-    # O resultado final é uma lista com um elemento por encomenda.
-    # Exemplo: {1: 2, 2: 3} → [1, 1, 2, 2, 2]
 
+def build_order_day_table(start: datetime, end_excl: datetime) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Pré-calcula os dias da janela e a probabilidade de cada um: o mês pesa ORDER_MONTH_WEIGHT e,
+    dentro do mês, cada dia pesa os seus boosts (fim de semana, Black Friday, Natal).
 
-def random_order_datetime(rng: random.Random, start: datetime, end_excl: datetime) -> datetime:
-    """Sazonalidade simples: pesos por mês + boost ao fim-de-semana (+ opcional Black Friday)."""
+    Returns:
+        Um tuplo (dias como datetime64[D], probabilidades que somam 1).
+    """
     if start >= end_excl:
         raise ValueError("`start` must be earlier than `end_excl`.")
 
-    # 1) Pesos por mês
-    month_weight = {
-        1:0.95, 2:0.95, 3:1.00, 4:1.05, 5:1.10,
-        6:0.95, 7:0.85, 8:0.90, 9:1.10, 10:1.25,
-        11:1.45, 12:1.80
-    }
-
-    # 2) Escolhe mês ponderado
-    from calendar import monthrange
-    months, weights = [], []
-    cur = datetime(start.year, start.month, 1)
-    end_anchor = datetime(end_excl.year, end_excl.month, 1)
-    while cur <= end_anchor:
-        m_start = max(cur, start)
-        last_day = monthrange(cur.year, cur.month)[1]
-        m_end_excl = min(datetime(cur.year, cur.month, last_day, 23, 59, 59) + timedelta(seconds=1), end_excl)
-        if m_start < m_end_excl:
-            months.append((m_start, m_end_excl))
-            weights.append(month_weight.get(cur.month, 1.0))
-        cur = datetime(cur.year+1, 1, 1) if cur.month == 12 else datetime(cur.year, cur.month+1, 1)
-    probs = [w/sum(weights) for w in weights]
-    m_start, m_end_excl = random.choices(months, weights=probs, k=1)[0]
-
-    # 3) Dia ponderado (fins-de-semana / eventos)
-    days = []
-    d = m_start.date()
-    last = (m_end_excl - timedelta(seconds=1)).date()
-    while d <= last:
-        w = 1.0
-        if d.weekday() >= 5: w *= 1.25           # Sábado/Domingo
-        if d.month == 11 and d.weekday() == 4 and 22 <= d.day <= 28: w *= 2.5  # Black Friday
-        if d.month == 12 and 20 <= d.day <= 24: w *= 1.5                       # Natal
-        days.append((d, w))
-        d += timedelta(days=1)
-    probs = [w/sum(w for _, w in days) for _, w in days]
-    chosen_day = random.choices([d for d, _ in days], weights=probs, k=1)[0]
-
-    # 4) Hora simples (pico 17–21h)
-    hour_weights = [1]*24
-    for h in range(17, 22): hour_weights[h] = 2
-    h = random.choices(range(24), weights=hour_weights, k=1)[0]
-    m = rng.randint(0, 59)
-    s = rng.randint(0, 59)
-    return datetime(chosen_day.year, chosen_day.month, chosen_day.day, h, m, s)
+    first = np.datetime64(start.date(), "D")
+    last = np.datetime64((end_excl - timedelta(seconds=1)).date(), "D")
+    days = np.arange(first, last + 1)
+
+    months = days.astype("datetime64[M]")
+    month_num = months.astype(np.int64) % 12 + 1                      # 1 = janeiro
+    day_num = (days - months).astype(np.int64) + 1                    # dia do mês
+    weekdays = (days.astype(np.int64) + 3) % 7                         # 1970-01-01 foi quinta-feira (0 = segunda)
+
+    day_w = np.where(weekdays >= 5, ORDER_WEEKEND_BOOST, 1.0)
+    day_w = day_w * np.where((month_num == 11) & (weekdays == 4) & (day_num >= 22) & (day_num <= 28), ORDER_BLACK_FRIDAY_BOOST, 1.0)
+    day_w = day_w * np.where((month_num == 12) & (day_num >= 20) & (day_num <= 24), ORDER_CHRISTMAS_BOOST, 1.0)
+
+    # peso do mês repartido pelos seus dias, na proporção do peso de cada dia
+    _, month_ix = np.unique(months, return_inverse=True)
+    month_w = np.array([ORDER_MONTH_WEIGHT.get(m, 1.0) for m in range(1, 13)])[month_num - 1]
+    weights = month_w * day_w / np.bincount(month_ix, weights=day_w)[month_ix]
+
+    return days, weights / weights.sum()
+
+
+@lru_cache(maxsize=None)
+def order_day_tables(start: datetime, end_excl: datetime) -> tuple[np.ndarray, np.ndarray, tuple[np.ndarray, np.ndarray]]:
+    """
+    Tabelas da janela, calculadas uma vez por janela e só de leitura:
+      - dias (datetime64[D]);
+      - CDF com 0 à cabeça (len(days) + 1): cdf[i] é a probabilidade acumulada antes do dia i;
+      - tabela de alias dos dias (sorteio O(1) quando a encomenda pode cair em toda a janela).
+    """
+    days, day_p = build_order_day_table(start, end_excl)
+    cdf = np.concatenate(([0.0], np.cumsum(day_p)))
+    cdf[-1] = 1.0
+    for arr in (days, cdf):
+        arr.setflags(write=False)
+    return days, cdf, build_alias_table(day_p)
+
+
+def sample_order_datetimes(
+    earliest: np.ndarray,
+    start: datetime,
+    end_excl: datetime,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """
+    Sorteia, em bloco, um order_date por encomenda em [earliest[i], end_excl), com a sazonalidade de
+    build_order_day_table (mês, dia da semana, eventos) e pico horário às 17–21h.
+
+    Encomendas que podem cair em toda a janela (cliente ativo desde o início) e a hora do dia usam tabelas
+    de alias (O(1) por sorteio). As restantes sorteiam o dia por inversão da CDF restrita à cauda
+    [dia de earliest[i], fim): u ~ U(CDF[earliest], 1) e searchsorted.
+    Todos os uniformes (dia e hora) vêm de um só sorteio, e minuto+segundo de um só inteiro em [0, 3600).
+    Devolve datetime64[s].
+    """
+    days, cdf, day_alias = order_day_tables(start, end_excl)
+    n = len(earliest)
+    u_day, u_hour = rng.random((2, n))
+
+    # índice do primeiro dia permitido de cada encomenda
+    lo_idx = (earliest.astype("datetime64[D]") - days[0]).astype(np.int64).clip(0, len(days) - 1)
+    full = lo_idx == 0
+
+    day_idx = np.empty(n, dtype=np.int64)
+    day_idx[full] = draw_alias(day_alias, u_day[full])
+    lo_t = lo_idx[~full]
+    lo = cdf[lo_t]
+    day_idx[~full] = (np.searchsorted(cdf, lo + u_day[~full] * (1.0 - lo), side="right") - 1).clip(lo_t, len(days) - 1)
+
+    hours = draw_alias(ORDER_HOUR_ALIAS, u_hour)
+    offsets = hours * 3600 + rng.integers(0, 3600, size=n)   # hora + minuto/segundo uniformes
+    return days[day_idx].astype("datetime64[s]") + offsets.astype("timedelta64[s]")
+
+
+
+def sample_order_datetimes_in_chunks(
+    earliest: np.ndarray,
+    start: datetime,
+    end_excl: datetime,
+    seed_seq: np.random.SeedSequence,
+    workers: int = GENERATION_WORKERS,
+    chunk_size: int = GENERATION_CHUNK_SIZE,
+) -> np.ndarray:
+    """
+    Igual a sample_order_datetimes, mas por blocos de `chunk_size` encomendas, sorteados em `workers` threads.
+    Cada bloco usa um gerador filho de `seed_seq` (SeedSequence.spawn): o resultado é o mesmo para
+    qualquer nº de threads. Devolve datetime64[s], pela ordem de `earliest`.
+    """
+    n = len(earliest)
+    starts = range(0, n, chunk_size)
+    seeds = seed_seq.spawn(len(starts))
+    order_day_tables(start, end_excl)   # tabelas construídas antes de arrancar as threads
+
+    def build(i: int, chunk_seed: np.random.SeedSequence) -> np.ndarray:
+        return sample_order_datetimes(earliest[i:i + chunk_size], start, end_excl, np.random.default_rng(chunk_seed))
+
+    if workers > 1 and len(starts) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            parts = list(executor.map(build, starts, seeds))
+    else:
+        parts = [build(i, chunk_seed) for i, chunk_seed in zip(starts, seeds)]
+    return np.concatenate(parts) if parts else np.empty(0, dtype="datetime64[s]")
 
 # -----------------------------------------------------------------------------------------------------------------------------------------------------
 # DATA MODEL
 # -----------------------------------------------------------------------------------------------------------------------------------------------------
 
 @dataclass(frozen=True)
-class OrderRow:
-    customer_id: int
-    order_date: datetime
-    order_status_id: int
-    created_at: datetime
-    updated_at: datetime
+class OrderColumns:
+    """
+    Encomendas em colunas (SoA): arrays NumPy do mesmo comprimento, por ordem cronológica.
+    created_at e updated_at não têm coluna própria: são iguais a order_date.
+    """
+    customer_id: np.ndarray       # int64
+    order_date: np.ndarray        # datetime64[s]
+    order_status_id: np.ndarray   # int64
+
+    def __len__(self) -> int:
+        return len(self.customer_id)
+
+    def __getitem__(self, rows: slice) -> "OrderColumns":
+        # fatia de linhas (views sobre os mesmos arrays, sem cópia)
+        return OrderColumns(self.customer_id[rows], self.order_date[rows], self.order_status_id[rows])
+
+    @classmethod
+    def empty(cls) -> "OrderColumns":
+        return cls(np.empty(0, dtype=np.int64), np.empty(0, dtype="datetime64[s]"), np.empty(0, dtype=np.int64))
 
 # -----------------------------------------------------------------------------------------------------------------------------------------------------
 # GENERATION
@@ -263,29 +415,31 @@ class OrderRow:
 def plan_orders_for_customers(
     customer_ids: Sequence[int],
     orders_weights: Mapping[int, float],
-    rng: random.Random,
+    rng_np: np.random.Generator,
     min_total_orders: int | None,
-) -> list[int]:
+) -> np.ndarray:
     """
-    Gera o plano de encomendas (lista de customer_ids, um por encomenda),
+    Gera o plano de encomendas (array de customer_ids, um por encomenda),
     respeitando um mínimo global se fornecido.
+
+    As quotas são sorteadas uma só vez; se o total ficar abaixo do mínimo, o défice é distribuído
+    por clientes abaixo do máximo (top_up_quotas), em vez de se regenerar o plano inteiro.
     """
-    buckets = list(orders_weights.keys())
-    probs = list(orders_weights.values())
+    buckets = np.fromiter(orders_weights.keys(), dtype=np.int64)
+    probs = np.fromiter(orders_weights.values(), dtype=np.float64)
+    probs /= probs.sum()
 
-    attempt = 0
-    while True:
-        attempt += 1
-        quotas = build_customer_quotas(customer_ids, buckets, probs, rng)
-        plan = quotas_to_orders(quotas)
+    quotas = build_customer_quotas(len(customer_ids), buckets, probs, rng_np)
 
-        if min_total_orders is None or len(plan) >= min_total_orders:
-            rng.shuffle(plan)
-            if attempt > 1:
-                print(f"[info] mínimo atingido na tentativa {attempt}: total={len(plan)}")
-            return plan
+    total = int(quotas.sum())
+    if min_total_orders is not None and total < min_total_orders:
+        top_up_quotas(quotas, min_total_orders - total, int(buckets.max()), rng_np)
+        print(f"[info] total={total} < mínimo={min_total_orders} → +{min_total_orders - total} encomendas distribuídas")
 
-        print(f"[info] tentativa {attempt}: total={len(plan)} < mínimo={min_total_orders} → regenerar...")
+    # cada cliente repetido quota vezes (ex.: quotas {1: 2, 2: 3} → [1, 1, 2, 2, 2]), baralhado
+    plan = np.repeat(np.asarray(customer_ids, dtype=np.int64), quotas)
+    rng_np.shuffle(plan)
+    return plan
 
 
 def generate_order_rows(
@@ -298,81 +452,281 @@ def generate_order_rows(
     cancelled_weight: int,
     *,
     activation_map: Mapping[int, datetime],
-) -> list[OrderRow]:
+    seed_seq: np.random.SeedSequence,
+) -> OrderColumns:
     """
     Para cada customer_id no plano, gera um order_date ∈ [max(start, activation[cid]), end_excl),
-    ordena cronologicamente e constrói OrderRow. Clientes ainda não "ativos" na janela são ignorados.
+    ordena cronologicamente e devolve as encomendas em colunas. Clientes ainda não "ativos" na janela
+    são ignorados. As datas são sorteadas em bloco, por blocos paralelos (sample_order_datetimes_in_chunks).
     """
-    if not customer_plan:
-        return []
+    if not len(customer_plan):
+        return OrderColumns.empty()
 
-    status_choices = ("delivered", "cancelled")
-    status_weights = (delivered_weight, cancelled_weight)
+    # ids dos estados e pesos acumulados (o random.choices não tem de os acumular)
+    status_choices = (status_map["delivered"], status_map["cancelled"])
+    status_cum_weights = (delivered_weight, delivered_weight + cancelled_weight)
 
-    pairs: list[tuple[datetime, int]] = []
-    for cid in customer_plan:
-        # limite inferior: quando o cliente "existe"
-        cust_start = max(start, activation_map.get(cid, start))
-        if cust_start >= end_excl:
-            # este cliente só ficou ativo depois da janela — ignora esta ocorrência
-            continue
+    # limite inferior de cada encomenda: quando o cliente "existe"
+    plan = np.asarray(customer_plan, dtype=np.int64)
+    earliest = np.array([max(start, activation_map.get(cid, start)) for cid in plan.tolist()], dtype="datetime64[s]")
 
-        dt = random_order_datetime(rng, cust_start, end_excl)
-        pairs.append((dt, cid))
+    # clientes que só ficaram ativos depois da janela — ignora essas ocorrências
+    active = earliest < np.datetime64(end_excl, "s")
+    if not active.any():
+        return OrderColumns.empty()
 
-    if not pairs:
-        return []
+    dates = sample_order_datetimes_in_chunks(earliest[active], start, end_excl, seed_seq)
+    cids = plan[active]
 
-    # ordenar por data para manter cronologia global
-    pairs.sort(key=lambda t: t[0])
+    # ordenar por data para manter cronologia global (argsort estável: empates ficam pela ordem do plano)
+    order = np.argsort(dates, kind="stable")
 
-    rows: list[OrderRow] = []
-    for dt, cust_id in pairs:
-        status_code = rng.choices(status_choices, weights=status_weights, k=1)[0]
-        status_id = status_map[status_code]
-        rows.append(OrderRow(cust_id, dt, status_id, dt, dt))
-    return rows
+    # estados de todas as encomendas numa só chamada
+    status_ids = rng.choices(status_choices, cum_weights=status_cum_weights, k=len(order))
+
+    return OrderColumns(cids[order], dates[order], np.array(status_ids, dtype=np.int64))
 
 # -----------------------------------------------------------------------------------------------------------------------------------------------------
 # PERSISTÊNCIA
 # -----------------------------------------------------------------------------------------------------------------------------------------------------
 
-SQL_INSERT = """
+# INSERT multi-linha: um só statement (e uma ida à rede) por grupo de linhas, em vez de uma por linha.
+SQL_INSERT_PREFIX = """
 INSERT INTO orders (customer_id, order_date, order_status_id, created_at, updated_at)
-VALUES (%s, %s, %s, %s, %s)
+VALUES """
+SQL_ROW_PLACEHOLDER = "(%s, %s, %s, %s, %s)"
+ORDER_COLUMNS = 5
+
+# Carregamento em bloco a partir de um ficheiro TSV (o caminho é passado como parâmetro).
+# Só há inteiros e datas, por isso não é preciso escapar campos; created_at/updated_at = order_date no SET.
+SQL_LOAD_DATA = """
+LOAD DATA LOCAL INFILE %s
+INTO TABLE orders
+FIELDS TERMINATED BY '\\t'
+LINES TERMINATED BY '\\n'
+(customer_id, @order_date, order_status_id)
+SET order_date = @order_date, created_at = @order_date, updated_at = @order_date
 """
 
+# Formato de uma linha do TSV (customer_id, order_date, order_status_id)
+TSV_ROW_FORMAT = "%d\t%s\t%d\n"
+
+# Erros MySQL que indicam que o LOAD DATA LOCAL está desativado (cliente ou servidor).
+LOAD_DATA_DISABLED_ERRNOS = {1148, 2068, 3948}
+
+# Estimativa (por excesso) do tamanho de uma linha no statement, para caber no max_allowed_packet.
+# ex.: "(123456, '2023-01-01 00:00:00', 1, '2023-01-01 00:00:00', '2023-01-01 00:00:00'),"
+ROW_SQL_BYTES = 128
+
+# Limite de placeholders por prepared statement no protocolo MySQL (nº de parâmetros é um uint16).
+MAX_PREPARED_PLACEHOLDERS = 65_535
+
+
+@contextmanager
+def bulk_load_session(cur: "mysql.connector.cursor.MySQLCursor") -> Iterator[None]:
+    """
+    Relaxa as verificações da sessão MySQL durante o carregamento e repõe os valores anteriores no fim
+    (mesmo em caso de erro). O sql_log_bin é tratado à parte (disable_session_binlog), fora da transação.
+    """
+    cur.execute("SELECT @@SESSION.unique_checks, @@SESSION.foreign_key_checks")
+    unique_checks, fk_checks = cur.fetchone()
+    cur.execute("SET SESSION unique_checks = 0, foreign_key_checks = 0")
+
+    try:
+        yield
+    finally:
+        cur.execute(
+            "SET SESSION unique_checks = %s, foreign_key_checks = %s",
+            (int(unique_checks), int(fk_checks)),
+        )
+
+
+def disable_session_binlog(conn: "mysql.connector.abstracts.MySQLConnectionAbstract") -> int | None:
+    """
+    Desliga o binary log da sessão (sql_log_bin = 0) se BULK_LOAD_SKIP_BINLOG, e devolve o valor anterior
+    (None se não foi alterado). O MySQL recusa mudar sql_log_bin dentro de uma transação (erro 1694), por isso
+    tem de ser chamada antes do primeiro statement da sessão. Exige privilégios; sem eles o carregamento
+    continua com binlog.
+    """
+    if not BULK_LOAD_SKIP_BINLOG:
+        return None
+    with conn.cursor() as cur:
+        cur.execute("SELECT @@SESSION.sql_log_bin")
+        (log_bin,) = cur.fetchone()
+        try:
+            cur.execute("SET SESSION sql_log_bin = 0")
+        except mysql.connector.Error as e:
+            print(f"[info] Binlog mantido ativo neste carregamento ({e.msg}).")
+            return None
+    return int(log_bin)
+
+
+def restore_session_binlog(conn: "mysql.connector.abstracts.MySQLConnectionAbstract", log_bin: int | None) -> None:
+    """
+    Repõe o sql_log_bin anterior (ver disable_session_binlog). Só depois do commit, fora da transação;
+    em caso de erro não é preciso: a ligação é fechada e o valor da sessão perde-se com ela.
+    """
+    if log_bin is not None:
+        with conn.cursor() as cur:
+            cur.execute("SET SESSION sql_log_bin = %s", (log_bin,))
+
+
+def fetch_max_allowed_packet(cur: "mysql.connector.cursor.MySQLCursor") -> int:
+    """Lê o max_allowed_packet do servidor (tamanho máximo de um statement)."""
+    cur.execute("SHOW VARIABLES LIKE 'max_allowed_packet'")
+    row = cur.fetchone()
+    return int(row[1]) if row else 4 * 1024 * 1024  # default do MySQL 5.7
+
+
+@lru_cache(maxsize=None)
+def insert_sql(n_rows: int) -> str:
+    """
+    Devolve o INSERT multi-linha para `n_rows` encomendas.
+
+    Em cache: com um cursor preparado, o mysql.connector só reutiliza o statement já preparado
+    no servidor se receber o mesmo objeto string (todos os statements completos partilham o mesmo).
+    """
+    
+    return SQL_INSERT_PREFIX + ",".join([SQL_ROW_PLACEHOLDER] * n_rows)
+
+
+def rows_per_statement(batch_size: int, max_rows: int) -> int:
+    """
+    Nº de linhas por statement: divide cada batch em partes iguais de até `max_rows` linhas,
+    para que os batches completos usem um único statement preparado (sem resto com outro tamanho).
+    """
+    
+    parts = -(-batch_size // max_rows)
+    return -(-batch_size // parts)
+
+
+def insert_rows(
+    cur: "mysql.connector.cursor.MySQLCursor",
+    params: list,
+    max_rows_per_statement: int,
+) -> int:
+    """
+    Insere as linhas de `params` (lista achatada, ORDER_COLUMNS valores por linha) com INSERTs multi-linha
+    de até `max_rows_per_statement` linhas cada. Devolve o nº de linhas.
+    `cur` deve ser preparado (`conn.cursor(prepared=True)`): o statement é analisado uma vez e reutilizado.
+    """
+    n_rows = len(params) // ORDER_COLUMNS
+    for start in range(0, n_rows, max_rows_per_statement):
+        end = min(start + max_rows_per_statement, n_rows)
+        chunk = params if (start, end) == (0, n_rows) else params[start * ORDER_COLUMNS:end * ORDER_COLUMNS]
+        cur.execute(insert_sql(end - start), chunk)
+    return n_rows
+
+
+def iter_order_batches(orders: OrderColumns, batch_size: int) -> Iterator[list]:
+    """
+    Gera os parâmetros de cada batch (lista achatada: customer_id, order_date, order_status_id,
+    created_at, updated_at, ...) a partir das colunas, um batch de cada vez.
+
+    A lista é alocada uma vez e reutilizada em todos os batches (preenchida por fatias estendidas,
+    sem tuplos por linha): o consumidor tem de a usar antes de pedir o batch seguinte.
+    """
+    n = len(orders)
+    step = batch_size or n
+    buffer: list = [None] * (min(step, n) * ORDER_COLUMNS)
+    for start in range(0, n, step):
+        end = min(start + step, n)
+        del buffer[(end - start) * ORDER_COLUMNS:]   # só encolhe no último batch (parcial)
+        dates = orders.order_date[start:end].tolist()   # datetime64[s] -> datetime
+        buffer[0::ORDER_COLUMNS] = orders.customer_id[start:end].tolist()
+        buffer[1::ORDER_COLUMNS] = dates
+        buffer[2::ORDER_COLUMNS] = orders.order_status_id[start:end].tolist()
+        buffer[3::ORDER_COLUMNS] = dates   # created_at
+        buffer[4::ORDER_COLUMNS] = dates   # updated_at
+        yield buffer
+
+
+def load_batch(cur: "mysql.connector.cursor.MySQLCursor", batch: OrderColumns) -> int:
+    """Carrega um batch de encomendas com LOAD DATA LOCAL INFILE, através de um ficheiro TSV temporário."""
+    n = len(batch)
+    if not n:
+        return 0
+
+    # datas formatadas em bloco ('YYYY-MM-DD HH:MM:SS') e valores intercalados numa lista achatada
+    dates = np.char.replace(np.datetime_as_string(batch.order_date, unit="s"), "T", " ")
+    values: list = [None] * (n * 3)
+    values[0::3] = batch.customer_id.tolist()
+    values[1::3] = dates.tolist()
+    values[2::3] = batch.order_status_id.tolist()
+
+    # O conector lê o ficheiro a partir do disco (não aceita um buffer em memória),
+    # por isso o TSV é escrito num ficheiro temporário
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", newline="\n", suffix=".tsv", delete=False) as f:
+        f.write((TSV_ROW_FORMAT * n) % tuple(values))
+
+    try:
+        cur.execute(SQL_LOAD_DATA, (f.name,))
+    finally:
+        os.remove(f.name)
+    return n
+
+
+def load_orders_in_batches(
+    cur: "mysql.connector.cursor.MySQLCursor",
+    orders: OrderColumns,
+    batch_size: int,
+) -> tuple[int, int] | None:
+    """
+    Carrega `orders` por batches com LOAD DATA LOCAL INFILE; devolve (total, num_batches).
+    Devolve None se o servidor/cliente recusar o LOAD DATA logo no primeiro batch (nada foi carregado).
+    """
+    n = len(orders)
+    step = batch_size or n
+    total, batches = 0, 0
+    for start in range(0, n, step):
+        try:
+            total += load_batch(cur, orders[start:start + step])
+        except mysql.connector.Error as e:
+            if batches or e.errno not in LOAD_DATA_DISABLED_ERRNOS:
+                raise
+            print(f"[info] LOAD DATA LOCAL INFILE indisponível ({e.msg}); a usar INSERT multi-linha.")
+            return None
+        batches += 1
+    return total, batches
+
+
 def insert_orders_in_batches(
-    conn: "mysql.connector.connection.MySQLConnection",
-    rows: Sequence[OrderRow],
+    conn: "mysql.connector.abstracts.MySQLConnectionAbstract",
+    orders: OrderColumns,
     batch_size: int,
 ) -> tuple[int, int]:
     """
-    Insere `rows` por batches; devolve (total_inserted, num_batches).
+    Insere `orders` por batches, numa única transação (um só commit no fim) e com as verificações
+    da sessão relaxadas; devolve (total_inserted, num_batches).
+    Usa LOAD DATA LOCAL INFILE se ativo e disponível; caso contrário, INSERTs multi-linha com os
+    batches gerados em streaming (iter_order_batches), um de cada vez.
     """
     total_inserted = 0
     batches = 0
 
-    if not rows:
+    n = len(orders)
+    if not n:
         return 0, 0
 
-    with conn.cursor() as cur:
-        buffer: list[tuple[int, datetime, int, datetime, datetime]] = []
-
-        for r in rows:
-            buffer.append((r.customer_id, r.order_date, r.order_status_id, r.created_at, r.updated_at))
-            if batch_size and len(buffer) >= batch_size:
-                cur.executemany(SQL_INSERT, buffer)
-                conn.commit()
-                total_inserted += len(buffer)
-                batches += 1
-                buffer.clear()
-
-        if buffer:
-            cur.executemany(SQL_INSERT, buffer)
-            conn.commit()
-            total_inserted += len(buffer)
-            batches += 1
+    with conn.cursor() as cur, bulk_load_session(cur):
+        loaded = load_orders_in_batches(cur, orders, batch_size) if USE_LOAD_DATA_INFILE else None
+
+        if loaded is not None:
+            total_inserted, batches = loaded
+        else:
+            # nº de linhas por statement limitado pelo max_allowed_packet (lido uma vez; metade como margem)
+            # e pelo limite de placeholders de um prepared statement
+            max_rows = max(1, fetch_max_allowed_packet(cur) // 2 // ROW_SQL_BYTES)
+            max_rows = min(max_rows, MAX_PREPARED_PLACEHOLDERS // ORDER_COLUMNS)
+            stmt_rows = rows_per_statement(min(batch_size, n), max_rows)
+
+            # cursor preparado (parse único no servidor), partilhado por todos os batches
+            with conn.cursor(prepared=True) as insert_cur:
+                for params in iter_order_batches(orders, batch_size):
+                    total_inserted += insert_rows(insert_cur, params, stmt_rows)
+                    batches += 1
+
+    conn.commit()
 
     return total_inserted, batches
 
@@ -380,31 +734,34 @@ def insert_orders_in_batches(
 # RELATÓRIOS
 # -----------------------------------------------------------------------------------------------------------------------------------------------------
 
-def report_summary(rows: Sequence[OrderRow], status_map: Mapping[str, int]) -> None:
-    """Imprime sumário por ano, por estado e distribuição observada por cliente."""
-    if not rows:
+def report_summary(orders: OrderColumns, status_map: Mapping[str, int]) -> None:
+    """
+    Imprime sumário por ano, por estado e distribuição observada por cliente.
+    As contagens são feitas em NumPy sobre as colunas (np.unique / np.bincount), sem loops Python por linha.
+    """
+    if not len(orders):
         print("⚠️ Nenhuma encomenda gerada — nada a reportar.")
         return
 
     # por ano
-    year_counts: Counter[int] = Counter(r.order_date.year for r in rows)
+    years, year_n = np.unique(orders.order_date.astype("datetime64[Y]").astype(np.int64) + 1970, return_counts=True)
+    year_counts = dict(zip(years.tolist(), year_n.tolist()))
     print("📅 Distribuição por ano:")
     for y in (2023, 2024, 2025):
         print(f"  - {y}: {year_counts.get(y, 0)}")
 
-    # por estado
-    inv_status = {v: k for k, v in status_map.items()}
-    status_counts: Counter[str] = Counter(inv_status[r.order_status_id] for r in rows)
+    # por estado (contagem indexada pelo order_status_id)
+    status_n = np.bincount(orders.order_status_id, minlength=max(status_map.values()) + 1)
     print("🚚 Estados:")
     for s in ("delivered", "cancelled"):
-        print(f"  - {s}: {status_counts.get(s, 0)}")
+        print(f"  - {s}: {int(status_n[status_map[s]])}")
 
     # distribuição observada por nº de encomendas / cliente
-    per_customer: Counter[int] = Counter(r.customer_id for r in rows)
-    bucket_obs: Counter[int] = Counter(per_customer.values())
-    n_clients_observed = len({r.customer_id for r in rows})
+    _, per_customer = np.unique(orders.customer_id, return_counts=True)
+    bucket_obs = np.bincount(per_customer)
+    n_clients_observed = len(per_customer)
     print("👥 Clientes por nº de encomendas (observado):")
-    for k in sorted(bucket_obs):
+    for k in np.flatnonzero(bucket_obs).tolist():
         pct = 100.0 * bucket_obs[k] / n_clients_observed if n_clients_observed else 0.0
         print(f"  {k}: {bucket_obs[k]} clientes ({pct:.2f}%)")
 
@@ -419,14 +776,18 @@ def max_orders_possible(n_clients: int, dist_keys: Sequence[int]) -> int:
 
 def run(seed: int = SEED) -> None:
     rng = random.Random(seed)
+    rng_np = np.random.default_rng(seed)
+    seed_seq = np.random.SeedSequence(seed)
     print(f"🔌 A ligar à BD '{DB_CONFIG['database']}' como '{DB_CONFIG['user']}' em '{DB_CONFIG['host']}'...")
 
     # Coneção e transação
     conn = get_connection()
+    # antes do primeiro statement: o MySQL não deixa mudar sql_log_bin dentro de uma transação
+    log_bin = disable_session_binlog(conn)
     conn.autocommit = False
     
     try:
-        with conn.cursor() as cur:
+        with conn.cursor(buffered=False) as cur:
             
             cur.execute("SET time_zone = '+00:00';")
             
@@ -449,13 +810,13 @@ def run(seed: int = SEED) -> None:
             )
         
         # Plano (lista de customer_ids; 1 por encomenda)
-        customer_plan = plan_orders_for_customers(eligible_customers, ORDERS_WEIGHTS, rng, MIN_TOTAL_ORDERS)
-        if not customer_plan:
+        customer_plan = plan_orders_for_customers(eligible_customers, ORDERS_WEIGHTS, rng_np, MIN_TOTAL_ORDERS)
+        if not customer_plan.size:
             print("⚠️ Quotas resulted in 0 orders - nothing to insert.")
             return
 
-        # gerar linhas respeitando activation por cliente
-        rows = generate_order_rows(
+        # gerar encomendas (em colunas) respeitando activation por cliente
+        orders = generate_order_rows(
             customer_plan,
             status_map,
             rng,
@@ -464,11 +825,13 @@ def run(seed: int = SEED) -> None:
             DELIVERED_WEIGHT,
             CANCELLED_WEIGHT,
             activation_map=activation_map,
+            seed_seq=seed_seq,
         )
 
         # inserir em batches
         start_time = time.perf_counter()
-        total_inserted, batches = insert_orders_in_batches(conn, rows, BATCH_SIZE)
+        total_inserted, batches = insert_orders_in_batches(conn, orders, BATCH_SIZE)
+        restore_session_binlog(conn, log_bin)
         elapsed = time.perf_counter() - start_time
 
         print(f"✅ Inserted {total_inserted} orders in {batches} batch(es).")
@@ -476,7 +839,7 @@ def run(seed: int = SEED) -> None:
             print(f"⏱️ Insertion time: {elapsed:.2f}s (~{total_inserted/elapsed:.1f} rows/s)")
 
         # relatórios
-        report_summary(rows, status_map)
+        report_summary(orders, status_map)
 
     except mysql.connector.Error as e:
         conn.rollback()
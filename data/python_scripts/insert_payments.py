@@ -3,14 +3,18 @@
 # ------------------------------------------------------------------------------------------------------------------------------------
 
 import os
+import queue
+import threading
 import time
-import random
+import tempfile
+from contextlib import contextmanager
 from dataclasses import dataclass
-from decimal import Decimal
-from typing import Mapping, Sequence, TypeVar, Union
+from functools import lru_cache
+from itertools import accumulate
+from typing import Iterable, Iterator, Mapping, TypeVar, Union
 
 import mysql.connector
-from datetime import datetime, timedelta
+import numpy as np
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -20,6 +24,7 @@ load_dotenv()
 # ------------------------------------------------------------------------------------------------------------------------------------
 
 K = TypeVar("K")
+T = TypeVar("T")
 
 def normalize_distribution(dist: Mapping[K, Union[int, float]]) -> dict[K, float]:
     """
@@ -34,15 +39,79 @@ def normalize_distribution(dist: Mapping[K, Union[int, float]]) -> dict[K, float
         raise ValueError("Distribution must have positive weights.")
     return {k: float(v) / total for k, v in dist.items()}
 
-def weighted_choice_key(rng: random.Random, weights: Mapping[K, float]) -> K:
+def cumulative_table(weights: Mapping[K, float]) -> tuple[tuple[K, ...], tuple[float, ...], float]:
     """
-    Escolhe uma chave segundo pesos arbitrários (não precisam normalizar).
+    Pré-calcula (chaves, pesos acumulados, total) para sorteios repetidos com draw_from_table.
+    Os pesos são arbitrários (não precisam normalizar).
     """
     if not weights:
         raise ValueError("Empty weights.")
-    keys = list(weights.keys())
-    vals = list(weights.values())
-    return rng.choices(keys, weights=vals, k=1)[0]
+    cum_weights = tuple(accumulate(weights.values()))
+    return tuple(weights.keys()), cum_weights, cum_weights[-1] + 0.0
+
+def draw_from_table(table: tuple[tuple[K, ...], tuple[float, ...], float], u: np.ndarray) -> np.ndarray:
+    """
+    Sorteia, para cada uniforme de `u` ∈ [0, 1) já sorteada, o índice de uma chave de uma tabela de cumulative_table:
+    bisseção (searchsorted) nos pesos acumulados, como rng.choices(keys, weights=..., k=1)[0] para cada valor.
+    """
+    keys, cum_weights, total = table
+    return np.minimum(np.searchsorted(cum_weights, u * total, side="right"), len(keys) - 1)
+
+def subset_cumulative_tables(weights: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Pré-calcula, para cada subconjunto de chaves (bitmask de 0 a 2**len(weights) - 1), os pesos acumulados
+    com peso 0 fora do subconjunto, o total e o índice da última chave incluída.
+    Sortear num subconjunto fica uma consulta à tabela em vez de reconstruir os acumulados.
+    """
+    masks = np.arange(1 << len(weights))
+    allowed = (masks[:, None] >> np.arange(len(weights))) & 1 == 1
+    cum_weights = np.cumsum(np.where(allowed, weights, 0.0), axis=1)
+    last_allowed = len(weights) - 1 - np.argmax(allowed[:, ::-1], axis=1)
+    return cum_weights, cum_weights[:, -1].copy(), last_allowed
+
+_PIPELINE_DONE = object()
+
+def iterate_in_background(items: Iterable[T], maxsize: int) -> Iterator[T]:
+    """
+    Consome `items` numa thread produtora e devolve-os através de uma fila limitada.
+
+    Permite sobrepor a simulação dos pagamentos (CPU, NumPy) com o envio para a BD (I/O de rede, que liberta o GIL).
+    Uma exceção na thread produtora é relançada no consumidor; se o consumidor parar a meio,
+    a fila é drenada para a thread produtora terminar.
+    """
+    q: queue.Queue = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if stop.is_set():
+                    return
+                q.put(item)
+        except BaseException as e:
+            q.put(e)
+            return
+        q.put(_PIPELINE_DONE)
+
+    producer = threading.Thread(target=produce, name="payments-producer", daemon=True)
+    producer.start()
+
+    try:
+        while True:
+            item = q.get()
+            if item is _PIPELINE_DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        while producer.is_alive():
+            try:
+                q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        producer.join()
 
 # ------------------------------------------------------------------------------------------------------------------------------------
 # CONFIGS
@@ -55,6 +124,8 @@ DB_CONFIG = {
     "password": os.getenv("DB_PASS", ""),
     "database": os.getenv("DB_NAME", "ecommerce_db_test"),
     "charset": "utf8mb4",
+    # necessário para LOAD DATA LOCAL INFILE (o servidor também precisa de local_infile=ON)
+    "allow_local_infile": True,
 }
 
 SEED = 42
@@ -69,6 +140,9 @@ GLOBAL_ATTEMPT_WEIGHTS = normalize_distribution(GLOBAL_ATTEMPT_DIST)
 # Janela máx. (exclusiva) depois da compra para *todos* os registos de pagamento
 PAYMENT_WINDOW_SECONDS = 48 * 60 * 60   # 2 dias
 
+# Offset máximo (segundos) de uma tentativa sorteada; deixa margem para a tentativa forçada (+1s) ficar na janela
+ATTEMPT_MAX_OFFSET_SECONDS = max(1, PAYMENT_WINDOW_SECONDS - 2)
+
 # Config de métodos de pagamento
 PAYMENT_METHOD_CONFIG: dict[str, dict[str, Union[int, float]]] = {
     "card":         {"weight": 0.58, "max_attempts": 3, "stay_with_method_prob": 0.68, "success_rate": 0.62},
@@ -77,38 +151,108 @@ PAYMENT_METHOD_CONFIG: dict[str, dict[str, Union[int, float]]] = {
     "bank_transfer":{"weight": 0.06, "max_attempts": 2, "stay_with_method_prob": 0.35, "success_rate": 0.35},
 }
 
+# Tabelas acumuladas fixas (calculadas uma vez) para os sorteios mais frequentes
+GLOBAL_ATTEMPT_TABLE = cumulative_table(GLOBAL_ATTEMPT_WEIGHTS)
+METHOD_TABLE = cumulative_table({m: float(cfg.get("weight", 0.0)) for m, cfg in PAYMENT_METHOD_CONFIG.items()})
+
+# Parâmetros dos métodos em arrays (índice = posição em PAYMENT_METHOD_CONFIG), para a simulação vetorizada
+METHOD_CODES = tuple(PAYMENT_METHOD_CONFIG)
+METHOD_WEIGHT = np.array([float(cfg.get("weight", 0.0)) for cfg in PAYMENT_METHOD_CONFIG.values()])
+METHOD_CAP = np.array([min(int(cfg.get("max_attempts", MAX_GLOBAL_ATTEMPTS)), MAX_GLOBAL_ATTEMPTS) for cfg in PAYMENT_METHOD_CONFIG.values()])
+METHOD_STAY_PROB = np.array([float(cfg.get("stay_with_method_prob", 1.0)) for cfg in PAYMENT_METHOD_CONFIG.values()])
+METHOD_SUCCESS_RATE = np.array([float(cfg.get("success_rate", 0.0)) for cfg in PAYMENT_METHOD_CONFIG.values()])
+METHOD_BIT = 1 << np.arange(len(METHOD_CODES))  # subconjuntos de métodos como bitmask
+
+# Pesos acumulados, total e último método de cada um dos 2**nº métodos subconjuntos (16 com 4 métodos)
+METHOD_CUM_BY_MASK, METHOD_TOTAL_BY_MASK, METHOD_LAST_BY_MASK = subset_cumulative_tables(METHOD_WEIGHT)
+
+# Métodos disponíveis antes da 1ª tentativa (todos os que têm cap > 0)
+METHODS_AVAILABLE_AT_START = int(((METHOD_CAP > 0) * METHOD_BIT).sum())
+
+# Estado de encomenda cancelada (pode terminar sem pagamento com sucesso)
+CANCELLED_ORDER_STATUS_ID = 5
+
+# Uniformes pré-sorteadas por encomenda (uma linha por encomenda, numa só chamada ao gerador):
+# [método inicial, nº de tentativas] + por tentativa [manter método, trocar/re-escolher método, sucesso]
+U_METHOD, U_PLANNED = 0, 1
+U_STAY, U_SWITCH, U_SUCCESS = range(3)
+U_PER_ATTEMPT = 3
+UNIFORMS_PER_ORDER = 2 + U_PER_ATTEMPT * MAX_GLOBAL_ATTEMPTS
+
 # Idempotência: limpar pagamentos antes de inserir
 CLEAR_EXISTING_PAYMENTS = True
 
+# Limpar com TRUNCATE em vez de DELETE: mais rápido em tabelas grandes, mas é DDL e faz commit implícito
+# (a limpeza deixa de ser desfeita se o carregamento falhar)
+CLEAR_WITH_TRUNCATE = False
+
 # Batch size
 BATCH_SIZE = 20_000
 
+# Nº de encomendas simuladas de cada vez; cada bloco tem o seu gerador, derivado da seed
+GENERATION_CHUNK_SIZE = 50_000
+
+# Nº máximo de blocos de pagamentos gerados à espera de serem enviados (fila entre a thread de geração e a de inserção)
+PIPELINE_QUEUE_SIZE = 4
+
+# Durante o carregamento: desligar o binary log da sessão (sql_log_bin = 0 logo ao abrir a ligação, antes de
+# qualquer transação, e reposto depois do commit; exige privilégios, ignorado se não os houver)
+BULK_LOAD_SKIP_BINLOG = True
+
+# Carregar com LOAD DATA LOCAL INFILE (fallback automático para INSERT multi-linha se estiver desativado)
+USE_LOAD_DATA_INFILE = True
+
 # ------------------------------------------------------------------------------------------------------------------------------------
 # DATABASE
 # ------------------------------------------------------------------------------------------------------------------------------------
 
-def get_connection() -> "mysql.connector.connection.MySQLConnection":
-    """Abre ligação MySQL com as configs em DB_CONFIG."""
-    return mysql.connector.connect(use_pure=True, **DB_CONFIG)
+def get_connection() -> "mysql.connector.abstracts.MySQLConnectionAbstract":
+    """
+    Abre ligação MySQL com as configs em DB_CONFIG.
+    Usa a extensão C do conector (protocolo e escaping em C); se não estiver instalada, a implementação pura em Python.
+    """
+    try:
+        return mysql.connector.connect(use_pure=False, **DB_CONFIG)
+    except ImportError:
+        return mysql.connector.connect(use_pure=True, **DB_CONFIG)
 
 # ------------------------------------------------------------------------------------------------------------------------------------
 # DATA MODELS
 # ------------------------------------------------------------------------------------------------------------------------------------
 
 @dataclass(frozen=True)
-class OrderInfo:
-    order_id: int
-    order_date: datetime
-    order_status: int
-    order_total: Decimal
+class OrderColumns:
+    """Encomendas candidatas em colunas NumPy (uma posição por encomenda)."""
+    order_id: np.ndarray           # int64
+    order_date: np.ndarray         # datetime64[s]
+    order_status: np.ndarray       # int64
+    order_total_cents: np.ndarray  # int64, total em cêntimos (evita Decimal na geração)
+
+    def __len__(self) -> int:
+        return len(self.order_id)
+
+    def __getitem__(self, key: slice) -> "OrderColumns":
+        return OrderColumns(self.order_id[key], self.order_date[key], self.order_status[key], self.order_total_cents[key])
+
+
+# Registos de pagamento: array NumPy estruturado, pré-alocado na simulação (campos pela ordem das colunas do INSERT)
+PAYMENT_DTYPE = np.dtype([
+    ("order_id", np.int64),
+    ("attempt_no", np.int32),
+    ("payment_date", "datetime64[s]"),
+    ("amount_cents", np.int64),
+    ("method_id", np.int32),
+    ("status_id", np.int32),
+])
+PAYMENT_COLUMNS = len(PAYMENT_DTYPE.names)
 
 # ------------------------------------------------------------------------------------------------------------------------------------
 # FETCHERS
 # ------------------------------------------------------------------------------------------------------------------------------------
 
-def fetch_orders_with_totals(cur: "mysql.connector.cursor.MySQLCursor") -> list[OrderInfo]:
+def fetch_orders_with_totals(cur: "mysql.connector.cursor.MySQLCursor") -> OrderColumns:
     """
-    Lê orders + total calculado; filtra total > 0.
+    Lê orders + total calculado (em cêntimos, já convertido no servidor); filtra total > 0.
     """
     cur.execute(
         """
@@ -116,21 +260,24 @@ def fetch_orders_with_totals(cur: "mysql.connector.cursor.MySQLCursor") -> list[
             o.order_id,
             o.order_date,
             o.order_status_id,
-            COALESCE(SUM(oi.quantity * oi.unit_price), 0) AS total
+            CAST(COALESCE(SUM(oi.quantity * oi.unit_price), 0) * 100 AS SIGNED) AS total_cents
         FROM orders o
         LEFT JOIN order_items oi ON oi.order_id = o.order_id
         GROUP BY o.order_id, o.order_date, o.order_status_id
-        HAVING total > 0
+        HAVING total_cents > 0
         ORDER BY o.order_id ASC
         """
     )
     rows = cur.fetchall()
     if not rows:
         raise RuntimeError("The 'orders' table has no paid-total candidates (total > 0).")
-    out: list[OrderInfo] = []
-    for oid, dt, sid, total in rows:
-        out.append(OrderInfo(int(oid), dt, int(sid), Decimal(str(total))))
-    return out
+    oids, dates, sids, totals_cents = zip(*rows)
+    return OrderColumns(
+        np.array(oids, dtype=np.int64),
+        np.array(dates, dtype="datetime64[s]"),
+        np.array(sids, dtype=np.int64),
+        np.array(totals_cents, dtype=np.int64),
+    )
 
 
 def fetch_payment_methods(cur: "mysql.connector.cursor.MySQLCursor") -> tuple[dict[int, str], dict[str, int]]:
@@ -159,122 +306,419 @@ def fetch_payment_statuses(cur: "mysql.connector.cursor.MySQLCursor") -> tuple[d
 
 def clear_existing_payments(cur: "mysql.connector.cursor.MySQLCursor") -> None:
     """
-    Remove payments associados a encomendas (para evitar duplicação ao re-correr).
+    Remove todos os pagamentos (para evitar duplicação ao re-correr): o script regenera a tabela inteira,
+    por isso não é preciso voltar a calcular o total das encomendas (já lido em fetch_orders_with_totals).
     """
-    cur.execute(
-        """
-        DELETE p
-        FROM payments p
-        JOIN (
-            SELECT 
-                o.order_id,
-                COALESCE(SUM(oi.quantity * oi.unit_price), 0) AS total
-            FROM orders o
-            LEFT JOIN order_items oi ON oi.order_id = o.order_id
-            GROUP BY o.order_id
-            HAVING total > 0
-        ) t ON p.order_id = t.order_id
-        """
-    )
+    if CLEAR_WITH_TRUNCATE:
+        # nenhuma tabela referencia payments, por isso o TRUNCATE não precisa de desligar as foreign keys
+        cur.execute("TRUNCATE TABLE payments")
+    else:
+        cur.execute("DELETE FROM payments")
 
 # ------------------------------------------------------------------------------------------------------------------------------------
 # LÓGICA DE GERAÇÃO
 # ------------------------------------------------------------------------------------------------------------------------------------
 
-def build_method_weights() -> dict[str, float]:
-    """Extrai os pesos 'weight' por método, default 0.0 se em falta."""
-    return {m: float(cfg.get("weight", 0.0)) for m, cfg in PAYMENT_METHOD_CONFIG.items()}
-
-def available_methods_by_cap(method_counts: Mapping[str, int]) -> list[str]:
-    """Filtra métodos que ainda não atingiram o seu max_attempts (respeitando também MAX_GLOBAL_ATTEMPTS)."""
-    out: list[str] = []
-    for method, cfg in PAYMENT_METHOD_CONFIG.items():
-        max_m = int(cfg.get("max_attempts", MAX_GLOBAL_ATTEMPTS))
-        if method_counts.get(method, 0) < min(max_m, MAX_GLOBAL_ATTEMPTS):
-            out.append(method)
-    return out
+def draw_method_in(mask: np.ndarray, u: np.ndarray) -> np.ndarray:
+    """
+    Sorteia, por linha, um método do subconjunto `mask` (bitmask não vazia) ponderado por weight,
+    com a uniforme `u` já sorteada, a partir das tabelas pré-calculadas por subconjunto (METHOD_*_BY_MASK).
+    Os métodos fora do subconjunto têm peso 0 nos acumulados, o que dá o mesmo resultado que a bisseção
+    só nos métodos do subconjunto.
+    """
+    cum_weights = METHOD_CUM_BY_MASK[mask]
+    picked = (cum_weights <= (u * METHOD_TOTAL_BY_MASK[mask])[:, None]).sum(axis=1)
+    return np.minimum(picked, METHOD_LAST_BY_MASK[mask])
 
-def pick_next_method(rng: random.Random, current: str, method_counts: Mapping[str, int]) -> str:
+def pick_next_method(
+    current: np.ndarray, available: np.ndarray, u_stay: np.ndarray, u_switch: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
     """
-    Decide manter ou trocar método.
-    - Mantém com prob. stay_with_method_prob (se não atingiu cap).
+    Decide, por linha, o método da tentativa, com as uniformes já sorteadas `u_stay` e `u_switch`.
+    `available` é a bitmask dos métodos que ainda não atingiram o seu cap.
+    - Mantém com prob. stay_with_method_prob (se não atingiu cap); com u_stay = 0 mantém sempre (1ª tentativa).
     - Caso contrário, escolhe outro ponderado por weight, excluindo métodos no limite.
+    - Sem alternativas viáveis mantém o corrente; se este estiver no cap, as tentativas terminam.
+    Devolve (métodos, máscara das linhas sem método disponível).
     """
-    cfg = PAYMENT_METHOD_CONFIG.get(current, {})
-    stay_prob = float(cfg.get("stay_with_method_prob", 1.0))
-    max_curr = int(cfg.get("max_attempts", MAX_GLOBAL_ATTEMPTS))
-    if method_counts.get(current, 0) >= min(max_curr, MAX_GLOBAL_ATTEMPTS):
-        stay = False
-    else:
-        stay = rng.random() <= stay_prob
+    at_cap = (available & METHOD_BIT[current]) == 0
+    stay = ~at_cap & (u_stay <= METHOD_STAY_PROB[current])
 
-    if stay:
-        return current
+    alternatives = available & ~METHOD_BIT[current]
+    switch = ~stay & (alternatives != 0)
+    method = np.where(switch, draw_method_in(alternatives, u_switch), current)
+    return method, at_cap & ~switch
 
-    available = available_methods_by_cap(method_counts)
-    if current in available:
-        available.remove(current)
-    if not available:
-        return current  # sem alternativas viáveis
-
-    weights = {m: float(PAYMENT_METHOD_CONFIG[m].get("weight", 0.0)) for m in available}
-    return weighted_choice_key(rng, weights)
+def draw_attempt_offsets(rng_np: np.random.Generator, planned: np.ndarray) -> np.ndarray:
+    """
+    Sorteia, para todas as encomendas de uma só vez, os offsets (segundos) das tentativas em [1, ATTEMPT_MAX_OFFSET_SECONDS].
 
-def sorted_attempt_times(rng: random.Random, base_dt: datetime, n_attempts: int) -> list[datetime]:
+    Devolve uma matriz (nº encomendas × MAX_GLOBAL_ATTEMPTS): a linha i tem `planned[i]` offsets distintos
+    e ordenados nas primeiras colunas; as restantes ficam com sentinelas acima da janela (ignoradas).
+    Linhas com offsets repetidos (raras) são sorteadas de novo.
     """
-    Gera n timestamps aleatórios em (0, PAYMENT_WINDOW_SECONDS], ordenados.
+    shape = (len(planned), MAX_GLOBAL_ATTEMPTS)
+    cols = np.arange(MAX_GLOBAL_ATTEMPTS)
+    unused = cols >= np.asarray(planned)[:, None]
+    sentinels = np.broadcast_to(ATTEMPT_MAX_OFFSET_SECONDS + 1 + cols, shape)
+
+    offsets = np.where(unused, sentinels, rng_np.integers(1, ATTEMPT_MAX_OFFSET_SECONDS + 1, size=shape))
+    offsets.sort(axis=1)
+
+    redo = np.flatnonzero((np.diff(offsets, axis=1) == 0).any(axis=1))
+    while redo.size:
+        drawn = rng_np.integers(1, ATTEMPT_MAX_OFFSET_SECONDS + 1, size=(redo.size, MAX_GLOBAL_ATTEMPTS))
+        fresh = np.where(unused[redo], sentinels[redo], drawn)
+        fresh.sort(axis=1)
+        offsets[redo] = fresh
+        redo = redo[(np.diff(fresh, axis=1) == 0).any(axis=1)]
+    return offsets
+
+def draw_total_attempts_planned(u: np.ndarray) -> np.ndarray:
+    n = np.asarray(GLOBAL_ATTEMPT_TABLE[0])[draw_from_table(GLOBAL_ATTEMPT_TABLE, u)]
+    return np.minimum(n, MAX_GLOBAL_ATTEMPTS)
+
+def fill_payments(
+    out: np.ndarray,
+    orders: OrderColumns,
+    pos: np.ndarray,
+    attempt_nos: np.ndarray,
+    attempt_offsets: np.ndarray,
+    method_ids: np.ndarray,
+    is_paid: Union[np.ndarray, bool],
+    paid_status_id: int,
+    failed_status_id: int,
+) -> None:
+    """Escreve em `out` (fatia de um array PAYMENT_DTYPE) os registos das encomendas nas posições `pos`."""
+    out["order_id"] = orders.order_id[pos]
+    out["attempt_no"] = attempt_nos
+    out["payment_date"] = orders.order_date[pos] + attempt_offsets.astype("timedelta64[s]")
+    out["amount_cents"] = np.where(is_paid, orders.order_total_cents[pos], 0)
+    out["method_id"] = method_ids
+    out["status_id"] = np.where(is_paid, paid_status_id, failed_status_id)
+
+def simulate_payments(
+    orders: OrderColumns,
+    uniforms: np.ndarray,
+    planned: np.ndarray,
+    offsets: np.ndarray,
+    method_ids: np.ndarray,
+    fallback_method_id: int,
+    paid_status_id: int,
+    failed_status_id: int,
+) -> np.ndarray:
     """
-    if n_attempts <= 0:
-        return []
-    max_seconds = max(1, PAYMENT_WINDOW_SECONDS - 2)
-    n_attempts = min(n_attempts, max_seconds)
-
-    chosen: set[int] = set()
-    while len(chosen) < n_attempts:
-        chosen.add(rng.randint(1, max_seconds))
+    Simula as tentativas de pagamento de todas as encomendas em simultâneo (arrays NumPy, uma posição por encomenda):
+    o ciclo é sobre o nº da tentativa (no máx. MAX_GLOBAL_ATTEMPTS passos), não sobre as encomendas.
 
-    offsets = sorted(chosen)
-    return [base_dt + timedelta(seconds=s) for s in offsets]
+    Por encomenda, a lógica é a de sempre: método inicial ponderado; nas seguintes mantém/troca (pick_next_method,
+    que também re-escolhe se o método estiver no cap ou termina sem alternativas); pára no primeiro sucesso.
+    Encomendas não canceladas sem sucesso recebem uma tentativa final paga, 1s depois da última planeada.
+    `method_ids[i]` é o id na BD do i-ésimo método (-1 se não existir: a tentativa conta, mas não é registada).
 
-def draw_total_attempts_planned(rng: random.Random) -> int:
-    n = weighted_choice_key(rng, GLOBAL_ATTEMPT_WEIGHTS)
-    return min(int(n), MAX_GLOBAL_ATTEMPTS)
+    Os registos são escritos num array estruturado (PAYMENT_DTYPE) pré-alocado para o pior caso
+    (todas as tentativas + a forçada) e devolvidos ordenados por encomenda e tentativa.
+    """
+    n = len(orders)
+    current = draw_from_table(METHOD_TABLE, uniforms[:, U_METHOD])
+    method_counts = np.zeros((n, len(METHOD_CODES)), dtype=np.int8)  # contagens por método (índice = ordinal), <= MAX_GLOBAL_ATTEMPTS
+    available = np.full(n, METHODS_AVAILABLE_AT_START, dtype=np.int64)  # bitmask dos métodos abaixo do cap
+    attempt_no = np.zeros(n, dtype=np.int64)
+    paid = np.zeros(n, dtype=bool)
+    active = np.ones(n, dtype=bool)  # ainda a tentar (sem sucesso e com métodos disponíveis)
+
+    # registos escritos por passo; order_pos guarda a posição da encomenda de cada registo (para ordenar no fim)
+    payments = np.empty(n * (MAX_GLOBAL_ATTEMPTS + 1), dtype=PAYMENT_DTYPE)
+    order_pos = np.empty(len(payments), dtype=np.int64)
+    n_written = 0
+
+    for j in range(MAX_GLOBAL_ATTEMPTS):
+        idx = np.flatnonzero(active & (planned > j))
+        if not idx.size:
+            break
+        u = uniforms[idx, 2 + j * U_PER_ATTEMPT:2 + (j + 1) * U_PER_ATTEMPT]
+
+        # na 1ª tentativa mantém o método inicial (u_stay = 0), salvo se já estiver no cap
+        u_stay = u[:, U_STAY] if j else np.zeros(idx.size)
+        method, stop = pick_next_method(current[idx], available[idx], u_stay, u[:, U_SWITCH])
+        current[idx] = method
+
+        active[idx[stop]] = False
+        go = ~stop
+        idx, method, u = idx[go], method[go], u[go]
+
+        method_counts[idx, method] += 1
+        attempt_no[idx] += 1
+
+        # método que atingiu agora o cap sai da bitmask de disponíveis
+        reached = method_counts[idx, method] >= METHOD_CAP[method]
+        available[idx[reached]] &= ~METHOD_BIT[method[reached]]
+
+        # método desconhecido na BD -> tentativa ignorada (não é registada nem conta como paga)
+        ids = method_ids[method]
+        known = ids >= 0
+        success = known & (u[:, U_SUCCESS] < METHOD_SUCCESS_RATE[method])
+        succeeded = idx[success]
+        paid[succeeded] = True
+        active[succeeded] = False
+
+        logged = idx[known]
+        end = n_written + logged.size
+        fill_payments(
+            payments[n_written:end], orders, logged, attempt_no[logged], offsets[logged, j], ids[known], success[known],
+            paid_status_id, failed_status_id,
+        )
+        order_pos[n_written:end] = logged
+        n_written = end
+
+    # Força sucesso final para encomendas não-canceladas (canceladas podem terminar com falha)
+    forced = np.flatnonzero(~paid & (orders.order_status != CANCELLED_ORDER_STATUS_ID))
+    if forced.size:
+        last = planned[forced]
+        forced_offsets = np.where(last > 0, offsets[forced, np.maximum(last - 1, 0)] + 1, 1)
+        # método corrente; se não existir na BD, o primeiro da tabela
+        current_ids = method_ids[current[forced]]
+        forced_methods = np.where(current_ids >= 0, current_ids, fallback_method_id)
+        end = n_written + forced.size
+        fill_payments(
+            payments[n_written:end], orders, forced, attempt_no[forced] + 1, forced_offsets, forced_methods, True,
+            paid_status_id, failed_status_id,
+        )
+        order_pos[n_written:end] = forced
+        n_written = end
+
+    # ordem por encomenda (sort estável: as tentativas de cada encomenda já estão por ordem)
+    return payments[:n_written][np.argsort(order_pos[:n_written], kind="stable")]
+
+def iter_payment_chunks(
+    orders: OrderColumns,
+    seed_seq: np.random.SeedSequence,
+    method_ids: np.ndarray,
+    fallback_method_id: int,
+    paid_status_id: int,
+    failed_status_id: int,
+    chunk_size: int = GENERATION_CHUNK_SIZE,
+) -> Iterator[np.ndarray]:
+    """
+    Simula os pagamentos por blocos de `chunk_size` encomendas e devolve cada bloco como array PAYMENT_DTYPE,
+    sem materializar todos os registos de uma vez. Cada bloco usa um gerador próprio (SeedSequence.spawn).
+    """
+    starts = range(0, len(orders), chunk_size)
+    for start, child_seed in zip(starts, seed_seq.spawn(len(starts))):
+        rng_np = np.random.default_rng(child_seed)
+        chunk = orders[start:start + chunk_size]
+
+        # todas as uniformes do bloco numa só chamada (uma linha de UNIFORMS_PER_ORDER por encomenda)
+        uniforms = rng_np.random((len(chunk), UNIFORMS_PER_ORDER))
+
+        # nº de tentativas planeadas e respetivos offsets (segundos), para todas as encomendas do bloco
+        planned = draw_total_attempts_planned(uniforms[:, U_PLANNED])
+        offsets = draw_attempt_offsets(rng_np, planned)
+
+        yield simulate_payments(
+            chunk,
+            uniforms,
+            planned,
+            offsets,
+            method_ids,
+            fallback_method_id,
+            paid_status_id,
+            failed_status_id,
+        )
 
 # ------------------------------------------------------------------------------------------------------------------------------------
 # PERSISTÊNCIA
 # ------------------------------------------------------------------------------------------------------------------------------------
 
-SQL_INSERT_PAYMENT = """
+# INSERT multi-linha: o prefixo é seguido de um grupo de placeholders por linha, separados por vírgulas
+SQL_INSERT_PREFIX = """
 INSERT INTO payments (order_id, attempt_no, payment_date, amount_paid, payment_method_id, payment_status_id)
-VALUES (%s, %s, %s, %s, %s, %s)
+VALUES """
+# Só inteiros nos parâmetros, convertidos no servidor: payment_date chega em segundos desde a epoch (UTC; a sessão
+# usa time_zone '+00:00') e amount_paid em cêntimos (a divisão de inteiros dá um DECIMAL exato)
+SQL_ROW_PLACEHOLDER = "(%s, %s, FROM_UNIXTIME(%s), %s / 100, %s, %s)"
+
+# Estimativa (por excesso) do tamanho de uma linha no statement, para caber no max_allowed_packet.
+# ex.: "(123456, 4, FROM_UNIXTIME(1672531200), 1234567 / 100, 4, 2),"
+ROW_SQL_BYTES = 64
+
+# Limite de placeholders por prepared statement no protocolo MySQL (nº de parâmetros é um uint16).
+MAX_PREPARED_PLACEHOLDERS = 65_535
+
+# Carregamento em bloco a partir de um ficheiro TSV (o caminho é passado como parâmetro).
+# Só há inteiros, por isso não é preciso escapar campos; a data (epoch) e o montante (cêntimos) são convertidos no SET.
+SQL_LOAD_DATA = """
+LOAD DATA LOCAL INFILE %s
+INTO TABLE payments
+FIELDS TERMINATED BY '\\t'
+LINES TERMINATED BY '\\n'
+(order_id, attempt_no, @payment_ts, @amount_cents, payment_method_id, payment_status_id)
+SET payment_date = FROM_UNIXTIME(@payment_ts), amount_paid = @amount_cents / 100
 """
 
+# Formato de uma linha do TSV (mesma ordem de colunas do INSERT)
+TSV_ROW_FORMAT = "%d\t%d\t%d\t%d\t%d\t%d\n"
+
+# Erros MySQL que indicam que o LOAD DATA LOCAL está desativado (cliente ou servidor).
+LOAD_DATA_DISABLED_ERRNOS = {1148, 2068, 3948}
+
+@contextmanager
+def bulk_load_session(cur: "mysql.connector.cursor.MySQLCursor") -> Iterator[None]:
+    """
+    Relaxa as verificações da sessão MySQL durante o carregamento e repõe os valores anteriores no fim
+    (mesmo em caso de erro). O sql_log_bin é tratado à parte (disable_session_binlog), fora da transação.
+    `innodb_flush_log_at_trx_commit` não é alterado: só existe como variável global (afetaria todo o servidor).
+    """
+    cur.execute("SELECT @@SESSION.unique_checks, @@SESSION.foreign_key_checks")
+    unique_checks, fk_checks = cur.fetchone()
+    cur.execute("SET SESSION unique_checks = 0, foreign_key_checks = 0")
+
+    try:
+        yield
+    finally:
+        cur.execute(
+            "SET SESSION unique_checks = %s, foreign_key_checks = %s",
+            (int(unique_checks), int(fk_checks)),
+        )
+
+def disable_session_binlog(conn: "mysql.connector.abstracts.MySQLConnectionAbstract") -> int | None:
+    """
+    Desliga o binary log da sessão (sql_log_bin = 0) se BULK_LOAD_SKIP_BINLOG, e devolve o valor anterior
+    (None se não foi alterado). O MySQL recusa mudar sql_log_bin dentro de uma transação (erro 1694), por isso
+    tem de ser chamada antes do primeiro statement da sessão. Exige privilégios; sem eles o carregamento
+    continua com binlog.
+    """
+    if not BULK_LOAD_SKIP_BINLOG:
+        return None
+    with conn.cursor() as cur:
+        cur.execute("SELECT @@SESSION.sql_log_bin")
+        (log_bin,) = cur.fetchone()
+        try:
+            cur.execute("SET SESSION sql_log_bin = 0")
+        except mysql.connector.Error as e:
+            print(f"[info] Binlog mantido ativo neste carregamento ({e.msg}).")
+            return None
+    return int(log_bin)
+
+def restore_session_binlog(conn: "mysql.connector.abstracts.MySQLConnectionAbstract", log_bin: int | None) -> None:
+    """
+    Repõe o sql_log_bin anterior (ver disable_session_binlog). Só depois do commit, fora da transação;
+    em caso de erro não é preciso: a ligação é fechada e o valor da sessão perde-se com ela.
+    """
+    if log_bin is not None:
+        with conn.cursor() as cur:
+            cur.execute("SET SESSION sql_log_bin = %s", (log_bin,))
+
+def fetch_max_allowed_packet(cur: "mysql.connector.cursor.MySQLCursor") -> int:
+    """Lê o max_allowed_packet do servidor (tamanho máximo de um statement)."""
+    cur.execute("SHOW VARIABLES LIKE 'max_allowed_packet'")
+    row = cur.fetchone()
+    return int(row[1]) if row else 4 * 1024 * 1024  # default do MySQL 5.7
+
+def payment_values(batch: np.ndarray) -> list:
+    """
+    Achata um batch PAYMENT_DTYPE numa lista de valores intercalados (PAYMENT_COLUMNS por registo, ordem do INSERT).
+    Só inteiros: as datas seguem como segundos desde a epoch (FROM_UNIXTIME no servidor), sem formatar strings.
+    """
+    values: list = [None] * (len(batch) * PAYMENT_COLUMNS)
+    values[0::PAYMENT_COLUMNS] = batch["order_id"].tolist()
+    values[1::PAYMENT_COLUMNS] = batch["attempt_no"].tolist()
+    values[2::PAYMENT_COLUMNS] = batch["payment_date"].astype(np.int64).tolist()
+    values[3::PAYMENT_COLUMNS] = batch["amount_cents"].tolist()
+    values[4::PAYMENT_COLUMNS] = batch["method_id"].tolist()
+    values[5::PAYMENT_COLUMNS] = batch["status_id"].tolist()
+    return values
+
+@lru_cache(maxsize=None)
+def insert_sql(n_rows: int) -> str:
+    """
+    Devolve o INSERT multi-linha para `n_rows` pagamentos.
+
+    Em cache: com um cursor preparado, o mysql.connector só reutiliza o statement já preparado
+    no servidor se receber o mesmo objeto string (todos os statements completos partilham o mesmo).
+    """
+    return SQL_INSERT_PREFIX + ",".join([SQL_ROW_PLACEHOLDER] * n_rows)
+
+def rows_per_statement(batch_size: int, max_rows: int) -> int:
+    """
+    Nº de linhas por statement: divide cada batch em partes iguais de até `max_rows` linhas,
+    para que os batches completos usem um único statement preparado (sem resto com outro tamanho).
+    """
+    parts = -(-batch_size // max_rows)
+    return -(-batch_size // parts)
+
+def insert_rows(
+    cur: "mysql.connector.cursor.MySQLCursor",
+    batch: np.ndarray,
+    max_rows_per_statement: int,
+) -> int:
+    """
+    Insere `batch` (array PAYMENT_DTYPE) com INSERTs multi-linha (INSERT ... VALUES (...),(...),...) de até
+    `max_rows_per_statement` linhas cada, em vez de um statement por linha. Devolve o nº de linhas.
+    `cur` deve ser preparado (`conn.cursor(prepared=True)`): o statement é analisado uma vez e reutilizado.
+    """
+    values = payment_values(batch)
+    for start in range(0, len(batch), max_rows_per_statement):
+        end = min(start + max_rows_per_statement, len(batch))
+        cur.execute(insert_sql(end - start), values[start * PAYMENT_COLUMNS:end * PAYMENT_COLUMNS])
+    return len(batch)
+
+def load_batch(cur: "mysql.connector.cursor.MySQLCursor", batch: np.ndarray) -> int:
+    """Carrega um batch de pagamentos (array PAYMENT_DTYPE) com LOAD DATA LOCAL INFILE, através de um ficheiro TSV temporário."""
+    if not len(batch):
+        return 0
+
+    # O conector lê o ficheiro a partir do disco (não aceita um buffer em memória),
+    # por isso o TSV é escrito num ficheiro temporário
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", newline="\n", suffix=".tsv", delete=False) as f:
+        f.write((TSV_ROW_FORMAT * len(batch)) % tuple(payment_values(batch)))
+
+    try:
+        cur.execute(SQL_LOAD_DATA, (f.name,))
+    finally:
+        os.remove(f.name)
+    return len(batch)
+
 def insert_payments_in_batches(
-    conn: "mysql.connector.connection.MySQLConnection",
-    rows: Sequence[tuple[int, int, datetime, Decimal, int, int]],
+    conn: "mysql.connector.abstracts.MySQLConnectionAbstract",
+    row_chunks: Iterable[np.ndarray],
     batch_size: int,
 ) -> tuple[int, int]:
-    """Insere pagamentos por batches; devolve (total, num_batches)."""
+    """
+    Insere os blocos de pagamentos à medida que chegam, por batches, numa única transação (um só commit no fim)
+    e com as verificações da sessão relaxadas (bulk_load_session); devolve (total, num_batches).
+    Usa LOAD DATA LOCAL INFILE se ativo e disponível; se o servidor o recusar, passa a INSERTs multi-linha.
+    """
     total, batches = 0, 0
-    if not rows:
-        return total, batches
-
-    with conn.cursor() as cur:
-        buf: list[tuple[int, int, datetime, Decimal, int, int]] = []
-        for rec in rows:
-            buf.append(rec)
-            if batch_size and len(buf) >= batch_size:
-                cur.executemany(SQL_INSERT_PAYMENT, buf)
-                conn.commit()
-                total += len(buf)
+    use_load_data = USE_LOAD_DATA_INFILE
+    max_rows = 0
+
+    # cursor normal para a sessão e o LOAD DATA; cursor preparado (parse único no servidor) para o INSERT de recurso
+    with conn.cursor() as cur, conn.cursor(prepared=True) as insert_cur, bulk_load_session(cur):
+        for rows in row_chunks:
+            step = batch_size or len(rows)
+            for start in range(0, len(rows), step):
+                batch = rows[start:start + step]
                 batches += 1
-                buf.clear()
 
-        if buf:
-            cur.executemany(SQL_INSERT_PAYMENT, buf)
-            conn.commit()
-            total += len(buf)
-            batches += 1
+                if use_load_data:
+                    try:
+                        total += load_batch(cur, batch)
+                        continue
+                    except mysql.connector.Error as e:
+                        if e.errno not in LOAD_DATA_DISABLED_ERRNOS:
+                            raise
+                        print(f"[info] LOAD DATA LOCAL INFILE indisponível ({e.msg}); a usar INSERT multi-linha.")
+                        use_load_data = False
+
+                if not max_rows:
+                    # nº de linhas por statement limitado pelo max_allowed_packet (lido uma vez; metade como margem)
+                    # e pelo limite de placeholders de um prepared statement
+                    max_rows = max(1, fetch_max_allowed_packet(cur) // 2 // ROW_SQL_BYTES)
+                    max_rows = rows_per_statement(step, min(max_rows, MAX_PREPARED_PLACEHOLDERS // PAYMENT_COLUMNS))
+                total += insert_rows(insert_cur, batch, max_rows)
+
+    conn.commit()
 
     return total, batches
 
@@ -283,137 +727,52 @@ def insert_payments_in_batches(
 # ------------------------------------------------------------------------------------------------------------------------------------
 
 def run(seed: int = SEED) -> None:
-    rng = random.Random(seed)
+    seed_seq = np.random.SeedSequence(seed)
     print(
         f"🔌 A ligar à BD '{DB_CONFIG['database']}' como '{DB_CONFIG['user']}' em '{DB_CONFIG['host']}'..."
     )
 
     conn = get_connection()
+    # antes do primeiro statement: o MySQL não deixa mudar sql_log_bin dentro de uma transação
+    log_bin = disable_session_binlog(conn)
     conn.autocommit = False
 
     try:
         with conn.cursor() as cur:
+            # datas em UTC na sessão: o FROM_UNIXTIME do carregamento converte a epoch sem desvio de fuso
+            cur.execute("SET time_zone = '+00:00';")
+
             # fetch
             _, method_id_by_code = fetch_payment_methods(cur)
             _, status_id_by_code = fetch_payment_statuses(cur)
             orders = fetch_orders_with_totals(cur)
 
-            # limpeza (idempotência)
+            # limpeza (idempotência) — na mesma transação do carregamento (commit só no fim), salvo com TRUNCATE
             if CLEAR_EXISTING_PAYMENTS:
                 clear_existing_payments(cur)
-                conn.commit()
-
-            # pesos por método
-            method_weights = build_method_weights()
-
-            rows: list[tuple[int, int, datetime, Decimal, int, int]] = []
-
-            for order in orders:
-                planned_attempts = draw_total_attempts_planned(rng)
-                attempt_times = sorted_attempt_times(rng, order.order_date, planned_attempts)
-
-                current_method = weighted_choice_key(rng, method_weights)
-                method_counts: dict[str, int] = {m: 0 for m in PAYMENT_METHOD_CONFIG}
-
-                paid = False
-                attempt_no = 0
-
-                for t in attempt_times:
-                    if paid:
-                        break
-
-                    if attempt_no == 0:
-                        method = current_method
-                    else:
-                        method = pick_next_method(rng, current_method, method_counts)
-                        current_method = method
-
-                    # cap por método
-                    max_m = int(PAYMENT_METHOD_CONFIG[method].get("max_attempts", MAX_GLOBAL_ATTEMPTS))
-                    if method_counts[method] >= min(max_m, MAX_GLOBAL_ATTEMPTS):
-                        alt_avail = available_methods_by_cap(method_counts)
-                        if method in alt_avail:
-                            alt_avail.remove(method)
-                        if alt_avail:
-                            alt_weights = {m: float(PAYMENT_METHOD_CONFIG[m].get("weight", 0.0)) for m in alt_avail}
-                            method = weighted_choice_key(rng, alt_weights)
-                            current_method = method
-                        else:
-                            break  # sem alternativas dentro do cap
-
-                    method_counts[method] = method_counts.get(method, 0) + 1
-                    attempt_no += 1
-
-                    success_rate = float(PAYMENT_METHOD_CONFIG[method].get("success_rate", 0.0))
-                    is_success = rng.random() < success_rate
-
-                    method_id = method_id_by_code.get(method)
-                    if method_id is None:
-                        # método desconhecido na BD -> ignora tentativa
-                        continue
 
-                    if is_success:
-                        rows.append(
-                            (
-                                order.order_id,
-                                attempt_no,
-                                t,
-                                order.order_total,
-                                method_id,
-                                status_id_by_code["paid"],
-                            )
-                        )
-                        paid = True
-                        break
-                    else:
-                        rows.append(
-                            (
-                                order.order_id,
-                                attempt_no,
-                                t,
-                                Decimal("0.00"),
-                                method_id,
-                                status_id_by_code["failed"],
-                            )
-                        )
-                
-                if not paid:
-                    if order.order_status != 5:
-                        # Força sucesso final para encomendas não-canceladas
-                        t_force = (
-                            (attempt_times[-1] + timedelta(seconds=1))
-                            if attempt_times else (order.order_date + timedelta(seconds=1))
-                        )
-
-                        # Escolhe um método válido (tenta o corrente; se não houver, usa o primeiro da tabela)
-                        method_id = method_id_by_code.get(current_method)
-                        if method_id is None:
-                            method_id = next(iter(method_id_by_code.values()))
-
-                        attempt_no += 1
-                        rows.append(
-                            (
-                                order.order_id,
-                                attempt_no,
-                                t_force,
-                                order.order_total,
-                                method_id,
-                                status_id_by_code["paid"],
-                            )
-                        )
-                    else:
-                        # order_status == 5 (cancelada): é aceitável terminar com falha
-                        pass
-            
-            
-            
+            # id na BD de cada método (-1 se não existir) e método de recurso (o primeiro da tabela)
+            method_ids = np.array([method_id_by_code.get(m, -1) for m in METHOD_CODES], dtype=np.int64)
+            fallback_method_id = next(iter(method_id_by_code.values()))
+
+            # simulação por blocos numa thread produtora, sobreposta com a inserção (fila limitada)
+            row_chunks = iter_payment_chunks(
+                orders,
+                seed_seq,
+                method_ids,
+                fallback_method_id,
+                status_id_by_code["paid"],
+                status_id_by_code["failed"],
+            )
+
             start = time.perf_counter()
-            total, batches = insert_payments_in_batches(conn, rows, BATCH_SIZE)
+            total, batches = insert_payments_in_batches(conn, iterate_in_background(row_chunks, PIPELINE_QUEUE_SIZE), BATCH_SIZE)
+            restore_session_binlog(conn, log_bin)
             elapsed = time.perf_counter() - start
 
             print(f"✅ Inseridos {total} registos de pagamento para {len(orders)} encomendas em {batches} batch(es).")
             if elapsed > 0:
-                print(f"⏱️ Tempo de inserção: {elapsed:.2f}s (~{total/elapsed:.1f} rows/s)")
+                print(f"⏱️ Tempo de geração + inserção: {elapsed:.2f}s (~{total/elapsed:.1f} rows/s)")
 
     except mysql.connector.Error as e:
         conn.rollback()
@@ -3,47 +3,104 @@
 # ------------------------------------------------------------------------------------------------------------------------------------
 
 import os
+import queue
+import tempfile
+import threading
 import time
-import random
-from dataclasses import dataclass
-from decimal import Decimal, ROUND_HALF_UP
-from typing import Any, Mapping, Sequence, TypeVar, Union
+from contextlib import contextmanager
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from typing import Any, Iterable, Iterator, Mapping, Sequence, TypeVar, Union
 
 import mysql.connector
-from datetime import date, datetime, time as dtime, timedelta
+import numpy as np
 from dotenv import load_dotenv
 
 load_dotenv()
 
+T = TypeVar("T")
+
 # ------------------------------------------------------------------------------------------------------------------------------------
 # UTILS
 # ------------------------------------------------------------------------------------------------------------------------------------
 
-K = TypeVar("K")
-
-def clamp01(value: float) -> float:
-    return max(0.0, min(1.0, value))
-
-def normalize_distribution(dist: Mapping[K, Union[int, float]]) -> dict[K, float]:
-    """Normaliza {chave: peso} para somar 1.0. Recusa negativos e soma <= 0."""
-    if not dist:
-        raise ValueError("Distribution is empty.")
-    if any(v < 0 for v in dist.values()):
-        raise ValueError("Distribution weights cannot be negative.")
-    total = float(sum(dist.values()))
-    if total <= 0:
-        raise ValueError("Distribution must have positive weights.")
-    return {k: float(v) / total for k, v in dist.items()}
-
-def weighted_choice_key(rng: random.Random, weights: Mapping[K, float]) -> K:
-    """Escolhe uma chave segundo pesos (não precisam já de estar normalizados)."""
-    if not weights:
-        raise ValueError("Empty weights.")
-    keys = list(weights.keys())
-    vals = list(weights.values())
-    if any(v < 0 for v in vals) or sum(vals) <= 0:
-        raise ValueError("Invalid weights (negatives or non-positive sum).")
-    return rng.choices(keys, weights=vals, k=1)[0]
+def cumulative_rows(dists: Sequence[Mapping[str, float]]) -> tuple[tuple[tuple[str, ...], ...], np.ndarray]:
+    """
+    Pesos acumulados (normalizados, a terminar em 1.0) de várias distribuições fixas, numa matriz com uma linha
+    por distribuição; as colunas a mais ficam a 1.0 e nunca são sorteadas. Devolve (chaves por linha, matriz).
+    Calculada uma vez e só de leitura: sortear fica uma comparação vetorizada, sem normalizar em cada sorteio.
+    """
+    cum = np.ones((len(dists), max(len(d) for d in dists)))
+    for row, dist in enumerate(dists):
+        w = np.asarray(list(dist.values()), dtype=np.float64)
+        if not len(w) or w.min() < 0 or w.sum() <= 0:
+            raise ValueError("Distribution weights must be non-negative with a positive sum.")
+        cum[row, :len(w) - 1] = np.cumsum(w)[:-1] / w.sum()
+    cum.setflags(write=False)
+    return tuple(tuple(d) for d in dists), cum
+
+def group_offsets(sorted_keys: np.ndarray) -> np.ndarray:
+    """
+    Offsets (estilo CSR) dos grupos de chaves iguais num array já ordenado: o grupo k ocupa
+    [offsets[k], offsets[k + 1]). Uma só passagem, sem voltar a ordenar (ao contrário do np.unique).
+    """
+    if not len(sorted_keys):
+        return np.zeros(1, dtype=np.int64)
+    boundaries = np.flatnonzero(sorted_keys[1:] != sorted_keys[:-1]) + 1
+    return np.concatenate(([0], boundaries, [len(sorted_keys)]))
+
+def take_groups(offsets: np.ndarray, groups: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Posições dos elementos dos grupos `groups` (por esta ordem), contíguas, e os offsets do novo agrupamento.
+    """
+    counts = offsets[groups + 1] - offsets[groups]
+    new_offsets = np.concatenate(([0], np.cumsum(counts)))
+    positions = np.repeat(offsets[groups] - new_offsets[:-1], counts) + np.arange(new_offsets[-1])
+    return positions, new_offsets
+
+_PIPELINE_DONE = object()
+
+def iterate_in_background(items: Iterable[T], maxsize: int) -> Iterator[T]:
+    """
+    Consome `items` numa thread produtora e devolve-os através de uma fila limitada.
+
+    Permite sobrepor a leitura dos candidatos (I/O de rede, que liberta o GIL) com a sua conversão para colunas NumPy.
+    Uma exceção na thread produtora é relançada no consumidor; se o consumidor parar a meio,
+    a fila é drenada para a thread produtora terminar.
+    """
+    q: queue.Queue = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if stop.is_set():
+                    return
+                q.put(item)
+        except BaseException as e:
+            q.put(e)
+            return
+        q.put(_PIPELINE_DONE)
+
+    producer = threading.Thread(target=produce, name="returns-producer", daemon=True)
+    producer.start()
+
+    try:
+        while True:
+            item = q.get()
+            if item is _PIPELINE_DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        while producer.is_alive():
+            try:
+                q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        producer.join()
 
 # ------------------------------------------------------------------------------------------------------------------------------------
 # CONFIGS
@@ -56,6 +113,8 @@ DB_CONFIG = {
     "password": os.getenv("DB_PASS", ""),
     "database": os.getenv("DB_NAME", "ecommerce_db_test"),
     "charset": "utf8mb4",
+    # necessário para LOAD DATA LOCAL INFILE (o servidor também precisa de local_infile=ON)
+    "allow_local_infile": True,
 }
 
 RANDOM_SEED = 42
@@ -89,38 +148,99 @@ CATEGORY_REASON_DISTS: dict[str, dict[str, float]] = {
     "Pet Supplies": {"damaged": 0.20, "not_as_described": 0.22, "late": 0.08, "change_of_mind": 0.40, "other": 0.10},
 }
 
+# distribuição de razões para categorias sem entrada em CATEGORY_REASON_DISTS
+DEFAULT_REASON_DIST: dict[str, float] = {"other": 1.0}
+
+# Tabela acumulada das razões (calculada uma vez): uma linha por categoria de CATEGORY_REASON_DISTS
+# e uma última para DEFAULT_REASON_DIST; REASON_CODES[linha] são os códigos dessa linha
+REASON_ROW_BY_CATEGORY: dict[str, int] = {cat: row for row, cat in enumerate(CATEGORY_REASON_DISTS)}
+DEFAULT_REASON_ROW = len(REASON_ROW_BY_CATEGORY)
+REASON_CODES, REASON_CUM = cumulative_rows([*CATEGORY_REASON_DISTS.values(), DEFAULT_REASON_DIST])
+
 MAX_ITEMS_PER_ORDER = 5
 RETURN_MIN_DAYS = 3
 RETURN_MAX_DAYS = 30
+RETURN_HOUR = 12  # hora fixa do return_date (12:00:00)
 
 ALLOWED_ORDER_STATUS_CODES = ("delivered",)
 PAID_STATUS_CODES = ("paid",)
 
 BATCH_SIZE = 20_000
-CLEAR_EXISTING_FOR_ITEMS = True  # idempotência por item
+
+# Nº de linhas lidas de cada vez do cursor (não bufferizado) dos candidatos
+FETCH_BLOCK_ROWS = 50_000
+
+# Nº máximo de blocos lidos da BD à espera de serem convertidos (fila entre a thread de leitura e a principal)
+PIPELINE_QUEUE_SIZE = 4
+
+# Idempotência: limpar devoluções antes de inserir (o script regenera a tabela inteira)
+CLEAR_EXISTING_RETURNS = True
+
+# Limpar com TRUNCATE em vez de DELETE: mais rápido em tabelas grandes, mas é DDL e faz commit implícito
+# (a limpeza deixa de ser desfeita se o carregamento falhar)
+CLEAR_WITH_TRUNCATE = False
+
+# Durante o carregamento desliga, na sessão, unique_checks e foreign_key_checks (restaurados no fim).
+# Seguro aqui: order_item_id e return_reason_id vêm das próprias tabelas order_items/return_reasons.
+# Se True, não escreve o carregamento no binlog: sql_log_bin = 0 logo ao abrir a ligação, antes de qualquer
+# transação (requer privilégios; ignorado se falhar), reposto depois do commit.
+BULK_LOAD_SKIP_BINLOG = True
+
+# Carregar com LOAD DATA LOCAL INFILE (fallback automático para INSERT multi-linha se estiver desativado)
+USE_LOAD_DATA_INFILE = True
 
 # ------------------------------------------------------------------------------------------------------------------------------------
 # DATABASE
 # ------------------------------------------------------------------------------------------------------------------------------------
 
-def get_connection() -> "mysql.connector.connection.MySQLConnection":
-    return mysql.connector.connect(use_pure=True, **DB_CONFIG)
+def get_connection() -> "mysql.connector.abstracts.MySQLConnectionAbstract":
+    """
+    Abre ligação MySQL com as configs em DB_CONFIG.
+    Usa a extensão C do conector (protocolo e escaping em C); se não estiver instalada, a implementação pura em Python.
+    """
+    try:
+        return mysql.connector.connect(use_pure=False, **DB_CONFIG)
+    except ImportError:
+        return mysql.connector.connect(use_pure=True, **DB_CONFIG)
 
 # ------------------------------------------------------------------------------------------------------------------------------------
 # DATA MODELS
 # ------------------------------------------------------------------------------------------------------------------------------------
 
 @dataclass(frozen=True)
-class CandidateItem:
-    order_item_id: int
-    order_id: int
-    product_id: int
-    quantity: int
-    unit_price: Decimal
-    category_name: str
-    customer_iso: str
-    last_paid_at: datetime
-    order_updated_at: datetime
+class CandidateColumns:
+    """order_items candidatos em colunas NumPy (uma posição por item)."""
+    order_item_id: np.ndarray     # int64
+    order_id: np.ndarray          # int64
+    product_id: np.ndarray        # int64
+    quantity: np.ndarray          # int64
+    unit_price_cents: np.ndarray  # int64, preço unitário em cêntimos
+    category_id: np.ndarray       # int64
+    customer_country_id: np.ndarray  # int64
+    last_paid_at: np.ndarray      # datetime64[us]
+    order_updated_at: np.ndarray  # datetime64[us]
+
+    def __len__(self) -> int:
+        return len(self.order_item_id)
+
+    def __getitem__(self, key: Union[slice, np.ndarray]) -> "CandidateColumns":
+        return CandidateColumns(*(getattr(self, f.name)[key] for f in fields(self)))
+
+    @staticmethod
+    def concat(blocks: Sequence["CandidateColumns"]) -> "CandidateColumns":
+        if not blocks:
+            ids, stamps = np.empty(0, np.int64), np.empty(0, "datetime64[us]")
+            return CandidateColumns(ids, ids, ids, ids, ids, ids, ids, stamps, stamps)
+        return CandidateColumns(*(np.concatenate([getattr(b, f.name) for b in blocks]) for f in fields(CandidateColumns)))
+
+# Registos de devolução: array NumPy estruturado (campos pela ordem das colunas do INSERT)
+RETURN_DTYPE = np.dtype([
+    ("order_item_id", np.int64),
+    ("return_date", "datetime64[s]"),
+    ("refund_cents", np.int64),
+    ("reason_id", np.int64),
+])
+RETURN_COLUMNS = len(RETURN_DTYPE.names)
 
 @dataclass(frozen=True)
 class LookupMaps:
@@ -153,7 +273,7 @@ def fetch_lookup_maps(cur: "mysql.connector.cursor.MySQLCursor") -> LookupMaps:
 
     return LookupMaps(reason_map, category_map, country_map)
 
-def fetch_candidate_items(conn) -> list[CandidateItem]:
+def fetch_candidate_items(conn) -> CandidateColumns:
     sql = """
     WITH paid_orders AS (
         SELECT p.order_id, MAX(p.payment_date) AS last_paid_at
@@ -166,11 +286,10 @@ def fetch_candidate_items(conn) -> list[CandidateItem]:
         SELECT
             o.order_id,
             po.last_paid_at,
-            ctry.iso_code AS customer_iso
+            cu.country_id AS customer_country_id
         FROM orders o
         JOIN order_status os ON os.order_status_id = o.order_status_id
         JOIN customers cu    ON cu.customer_id = o.customer_id
-        JOIN countries ctry  ON ctry.country_id = cu.country_id
         JOIN paid_orders po  ON po.order_id = o.order_id
         WHERE os.code = %s               -- só 'cancelled'
     )
@@ -180,166 +299,422 @@ def fetch_candidate_items(conn) -> list[CandidateItem]:
         oi.product_id,
         oi.quantity,
         oi.unit_price,
-        pc.name AS category_name,
-        eo.customer_iso,
+        pr.category_id,
+        eo.customer_country_id,
         eo.last_paid_at,
         o2.updated_at AS order_updated_at      -- << buscamos aqui diretamente de orders
     FROM order_items oi
     JOIN products pr            ON pr.product_id = oi.product_id
-    JOIN product_categories pc  ON pc.category_id = pr.category_id
     JOIN eligible_orders eo     ON eo.order_id = oi.order_id
     JOIN orders o2              ON o2.order_id = oi.order_id
-    ORDER BY oi.order_item_id ASC
     """
     params = list(PAID_STATUS_CODES) + list(ALLOWED_ORDER_STATUS_CODES)
 
-    with conn.cursor(dictionary=True) as cur:
+    # cursor raw e não bufferizado: as linhas chegam como bytes, por blocos, e são convertidas já em colunas NumPy
+    # (sem dicionários por linha nem a lista completa do fetchall() em memória).
+    # Os blocos são lidos numa thread à parte, enquanto a principal converte o bloco anterior.
+    blocks: list[CandidateColumns] = []
+    with conn.cursor(raw=True, buffered=False) as cur:
         cur.execute(sql, params)
-        rows = cur.fetchall()
-
-    out: list[CandidateItem] = [
-        CandidateItem(
-            order_item_id=int(r["order_item_id"]),
-            order_id=int(r["order_id"]),
-            product_id=int(r["product_id"]),
-            quantity=int(r["quantity"]),
-            unit_price=Decimal(str(r["unit_price"])),
-            category_name=str(r["category_name"]),
-            customer_iso=str(r["customer_iso"]),
-            last_paid_at=r["last_paid_at"],
-            order_updated_at=r["order_updated_at"],
-        )
-        for r in rows
-    ]
-    return out
+        row_blocks = iter(lambda: cur.fetchmany(FETCH_BLOCK_ROWS), [])
+        for rows in iterate_in_background(row_blocks, PIPELINE_QUEUE_SIZE):
+            blocks.append(candidate_block(rows))
+
+    return CandidateColumns.concat(blocks)
+
+def candidate_block(rows: Sequence[tuple[bytes, ...]]) -> CandidateColumns:
+    """
+    Converte um bloco de linhas raw (bytes, pela ordem do SELECT dos candidatos) em colunas NumPy.
+    O unit_price (DECIMAL(10,2)) chega como texto com 2 casas decimais: sem o ponto, é já o valor em cêntimos.
+    """
+    cols = [np.array(list(map(bytes, col)), dtype="S") for col in zip(*rows)]
+    order_item_id, order_id, product_id, quantity, unit_price, category_id, customer_country_id, last_paid_at, order_updated_at = cols
+    return CandidateColumns(
+        order_item_id=order_item_id.astype(np.int64),
+        order_id=order_id.astype(np.int64),
+        product_id=product_id.astype(np.int64),
+        quantity=quantity.astype(np.int64),
+        unit_price_cents=np.char.replace(unit_price, b".", b"").astype(np.int64),
+        category_id=category_id.astype(np.int64),
+        customer_country_id=customer_country_id.astype(np.int64),
+        last_paid_at=last_paid_at.astype("datetime64[us]"),
+        order_updated_at=order_updated_at.astype("datetime64[us]"),
+    )
 
 # ------------------------------------------------------------------------------------------------------------------------------------
 # IDEMPOTÊNCIA & PERSISTÊNCIA
 # ------------------------------------------------------------------------------------------------------------------------------------
 
-def delete_returns_for_items(cur: "mysql.connector.cursor.MySQLCursor", order_item_ids: Sequence[int]) -> None:
-    if not order_item_ids:
-        return
-    placeholders = ",".join(["%s"] * len(order_item_ids))
-    cur.execute(f"DELETE FROM product_returns WHERE order_item_id IN ({placeholders})", list(order_item_ids))
-
-SQL_INSERT = """
+def clear_existing_returns(cur: "mysql.connector.cursor.MySQLCursor") -> None:
+    """
+    Remove todas as devoluções (para evitar duplicação ao re-correr) com um único statement,
+    em vez de um DELETE ... IN (...) com um placeholder por item.
+    """
+    if CLEAR_WITH_TRUNCATE:
+        # nenhuma tabela referencia product_returns, por isso o TRUNCATE não precisa de desligar as foreign keys
+        cur.execute("TRUNCATE TABLE product_returns")
+    else:
+        cur.execute("DELETE FROM product_returns")
+
+# INSERT multi-linha: o prefixo é seguido de um grupo de placeholders por linha, separados por vírgulas
+SQL_INSERT_PREFIX = """
 INSERT INTO product_returns (order_item_id, return_date, refund_amount, return_reason_id)
-VALUES (%s, %s, %s, %s)
+VALUES """
+# refund_amount chega em cêntimos (inteiro) e é convertido no servidor: a divisão de inteiros dá um DECIMAL exato
+SQL_ROW_PLACEHOLDER = "(%s, %s, %s / 100, %s)"
+
+# Estimativa (por excesso) do tamanho de uma linha no statement, para caber no max_allowed_packet.
+# ex.: "(1234567, '2023-01-01 12:00:00', 1234567 / 100, 5),"
+ROW_SQL_BYTES = 56
+
+# Limite de placeholders por prepared statement no protocolo MySQL (nº de parâmetros é um uint16).
+MAX_PREPARED_PLACEHOLDERS = 65_535
+
+# Carregamento em bloco a partir de um ficheiro TSV (o caminho é passado como parâmetro).
+# Só há inteiros, por isso não é preciso escapar campos; a data (epoch) e o montante (cêntimos) são convertidos no SET.
+SQL_LOAD_DATA = """
+LOAD DATA LOCAL INFILE %s
+INTO TABLE product_returns
+FIELDS TERMINATED BY '\\t'
+LINES TERMINATED BY '\\n'
+(order_item_id, @return_ts, @refund_cents, return_reason_id)
+SET return_date = FROM_UNIXTIME(@return_ts), refund_amount = @refund_cents / 100
 """
 
+# Formato de uma linha do TSV (mesma ordem de colunas do INSERT)
+TSV_ROW_FORMAT = "%d\t%d\t%d\t%d\n"
+
+# Erros MySQL que indicam que o LOAD DATA LOCAL está desativado (cliente ou servidor).
+LOAD_DATA_DISABLED_ERRNOS = {1148, 2068, 3948}
+
+@contextmanager
+def bulk_load_session(cur: "mysql.connector.cursor.MySQLCursor") -> Iterator[None]:
+    """
+    Relaxa as verificações da sessão MySQL durante o carregamento e repõe os valores anteriores no fim
+    (mesmo em caso de erro). O sql_log_bin é tratado à parte (disable_session_binlog), fora da transação.
+
+    Os índices secundários de product_returns (order_item_id, return_reason_id) suportam as foreign keys e
+    não podem ser apagados, e o ALTER TABLE ... DISABLE KEYS não tem efeito em InnoDB; ficam como estão.
+    """
+    cur.execute("SELECT @@SESSION.unique_checks, @@SESSION.foreign_key_checks")
+    unique_checks, fk_checks = cur.fetchone()
+    cur.execute("SET SESSION unique_checks = 0, foreign_key_checks = 0")
+
+    try:
+        yield
+    finally:
+        cur.execute(
+            "SET SESSION unique_checks = %s, foreign_key_checks = %s",
+            (int(unique_checks), int(fk_checks)),
+        )
+
+def disable_session_binlog(conn: "mysql.connector.abstracts.MySQLConnectionAbstract") -> int | None:
+    """
+    Desliga o binary log da sessão (sql_log_bin = 0) se BULK_LOAD_SKIP_BINLOG, e devolve o valor anterior
+    (None se não foi alterado). O MySQL recusa mudar sql_log_bin dentro de uma transação (erro 1694), por isso
+    tem de ser chamada antes do primeiro statement da sessão. Exige privilégios; sem eles o carregamento
+    continua com binlog.
+    """
+    if not BULK_LOAD_SKIP_BINLOG:
+        return None
+    with conn.cursor() as cur:
+        cur.execute("SELECT @@SESSION.sql_log_bin")
+        (log_bin,) = cur.fetchone()
+        try:
+            cur.execute("SET SESSION sql_log_bin = 0")
+        except mysql.connector.Error as e:
+            print(f"[info] Binlog mantido ativo neste carregamento ({e.msg}).")
+            return None
+    return int(log_bin)
+
+def restore_session_binlog(conn: "mysql.connector.abstracts.MySQLConnectionAbstract", log_bin: int | None) -> None:
+    """
+    Repõe o sql_log_bin anterior (ver disable_session_binlog). Só depois do commit, fora da transação;
+    em caso de erro não é preciso: a ligação é fechada e o valor da sessão perde-se com ela.
+    """
+    if log_bin is not None:
+        with conn.cursor() as cur:
+            cur.execute("SET SESSION sql_log_bin = %s", (log_bin,))
+
+def fetch_max_allowed_packet(cur: "mysql.connector.cursor.MySQLCursor") -> int:
+    """Lê o max_allowed_packet do servidor (tamanho máximo de um statement)."""
+    cur.execute("SHOW VARIABLES LIKE 'max_allowed_packet'")
+    row = cur.fetchone()
+    return int(row[1]) if row else 4 * 1024 * 1024  # default do MySQL 5.7
+
+def return_values(batch: np.ndarray) -> list:
+    """Achata um batch RETURN_DTYPE numa lista de valores intercalados (RETURN_COLUMNS por registo, ordem do INSERT)."""
+    values: list = [None] * (len(batch) * RETURN_COLUMNS)
+    values[0::RETURN_COLUMNS] = batch["order_item_id"].tolist()
+    values[1::RETURN_COLUMNS] = batch["return_date"].tolist()
+    values[2::RETURN_COLUMNS] = batch["refund_cents"].tolist()
+    values[3::RETURN_COLUMNS] = batch["reason_id"].tolist()
+    return values
+
+@lru_cache(maxsize=None)
+def insert_sql(n_rows: int) -> str:
+    """
+    Devolve o INSERT multi-linha para `n_rows` devoluções.
+
+    Em cache: com um cursor preparado, o mysql.connector só reutiliza o statement já preparado
+    no servidor se receber o mesmo objeto string (todos os statements completos partilham o mesmo).
+    """
+    return SQL_INSERT_PREFIX + ",".join([SQL_ROW_PLACEHOLDER] * n_rows)
+
+def rows_per_statement(batch_size: int, max_rows: int) -> int:
+    """
+    Nº de linhas por statement: divide cada batch em partes iguais de até `max_rows` linhas,
+    para que os batches completos usem um único statement preparado (sem resto com outro tamanho).
+    """
+    parts = -(-batch_size // max_rows)
+    return -(-batch_size // parts)
+
+def insert_rows(
+    cur: "mysql.connector.cursor.MySQLCursor",
+    batch: np.ndarray,
+    max_rows_per_statement: int,
+) -> int:
+    """
+    Insere `batch` (RETURN_DTYPE) com INSERTs multi-linha (INSERT ... VALUES (...),(...),...) de até
+    `max_rows_per_statement` linhas cada, em vez de um statement por linha. Devolve o nº de linhas.
+    `cur` deve ser preparado (`conn.cursor(prepared=True)`): o statement é analisado uma vez e reutilizado.
+    """
+    values = return_values(batch)
+    for start in range(0, len(batch), max_rows_per_statement):
+        end = min(start + max_rows_per_statement, len(batch))
+        cur.execute(insert_sql(end - start), values[start * RETURN_COLUMNS:end * RETURN_COLUMNS])
+    return len(batch)
+
+def load_batch(cur: "mysql.connector.cursor.MySQLCursor", batch: np.ndarray) -> int:
+    """Carrega um batch de devoluções (array RETURN_DTYPE) com LOAD DATA LOCAL INFILE, através de um ficheiro TSV temporário."""
+    if not len(batch):
+        return 0
+
+    # só inteiros no TSV: a data segue como epoch (segundos, UTC) e é convertida no servidor
+    values = np.column_stack((
+        batch["order_item_id"],
+        batch["return_date"].astype(np.int64),
+        batch["refund_cents"],
+        batch["reason_id"],
+    ))
+
+    # O conector lê o ficheiro a partir do disco (não aceita um buffer em memória),
+    # por isso o TSV é escrito num ficheiro temporário
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", newline="\n", suffix=".tsv", delete=False) as f:
+        f.write((TSV_ROW_FORMAT * len(batch)) % tuple(values.ravel().tolist()))
+
+    try:
+        cur.execute(SQL_LOAD_DATA, (f.name,))
+    finally:
+        os.remove(f.name)
+    return len(batch)
+
 def insert_returns_in_batches(
     conn: "mysql.connector.connection.MySQLConnection",
-    rows: Sequence[tuple[int, datetime, Decimal, int]],
+    rows: np.ndarray,
     batch_size: int,
 ) -> tuple[int, int]:
+    """
+    Insere as devoluções por batches, numa única transação (um só commit no fim, que inclui também a limpeza
+    feita antes na mesma ligação) e com as verificações da sessão relaxadas (bulk_load_session);
+    devolve (total, num_batches). Em caso de erro nada é confirmado: o rollback fica a cargo de quem chama.
+    Usa LOAD DATA LOCAL INFILE se ativo e disponível; se o servidor o recusar, passa a INSERTs multi-linha.
+    """
     total = 0
     batches = 0
-    if not rows:
-        return total, batches
-
-    with conn.cursor() as cur:
-        buf: list[tuple[int, datetime, Decimal, int]] = []
-        for rec in rows:
-            buf.append(rec)
-            if batch_size and len(buf) >= batch_size:
-                cur.executemany(SQL_INSERT, buf)
-                conn.commit()
-                total += len(buf)
-                batches += 1
-                buf.clear()
-
-        if buf:
-            cur.executemany(SQL_INSERT, buf)
-            conn.commit()
-            total += len(buf)
+    use_load_data = USE_LOAD_DATA_INFILE
+    max_rows = 0
+
+    # cursor normal para a sessão e o LOAD DATA; cursor preparado (parse único no servidor) para o INSERT de recurso
+    with conn.cursor() as cur, conn.cursor(prepared=True) as insert_cur, bulk_load_session(cur):
+        step = batch_size or len(rows) or 1
+        for start in range(0, len(rows), step):
+            batch = rows[start:start + step]
             batches += 1
 
+            if use_load_data:
+                try:
+                    total += load_batch(cur, batch)
+                    continue
+                except mysql.connector.Error as e:
+                    if e.errno not in LOAD_DATA_DISABLED_ERRNOS:
+                        raise
+                    print(f"[info] LOAD DATA LOCAL INFILE indisponível ({e.msg}); a usar INSERT multi-linha.")
+                    use_load_data = False
+
+            if not max_rows:
+                # nº de linhas por statement limitado pelo max_allowed_packet (lido uma vez; metade como margem)
+                # e pelo limite de placeholders de um prepared statement
+                max_rows = max(1, fetch_max_allowed_packet(cur) // 2 // ROW_SQL_BYTES)
+                max_rows = rows_per_statement(step, min(max_rows, MAX_PREPARED_PLACEHOLDERS // RETURN_COLUMNS))
+            total += insert_rows(insert_cur, batch, max_rows)
+
+    conn.commit()
+
     return total, batches
 
 # ------------------------------------------------------------------------------------------------------------------------------------
 # GERAÇÃO
 # ------------------------------------------------------------------------------------------------------------------------------------
 
+def resolve_reason_id(code: str, fallback_reason_map: Mapping[str, int]) -> int:
+    return (
+        fallback_reason_map.get(code)
+        or fallback_reason_map.get("other")
+        or next(iter(fallback_reason_map.values()))
+    )
+
+def reason_id_table(fallback_reason_map: Mapping[str, int]) -> np.ndarray:
+    """
+    REASON_CODES resolvidos uma vez para ids da BD (com o mesmo fallback de sempre), com a forma de REASON_CUM:
+    o reason_id sorteado é table[linha, coluna].
+    """
+    table = np.zeros(REASON_CUM.shape, dtype=np.int64)
+    for row, codes in enumerate(REASON_CODES):
+        table[row, :len(codes)] = [resolve_reason_id(code, fallback_reason_map) for code in codes]
+    return table
+
+def category_rate_lut(
+    category_name_to_id: Mapping[str, int],
+    max_category_id: int,
+    rates: Mapping[str, float],
+    default: float,
+) -> np.ndarray:
+    """
+    `rates` (por nome de categoria) indexado por category_id, com `default` nas categorias sem taxa configurada,
+    para obter a taxa de cada item com um só gather em vez de um dict.get por item.
+    """
+    lut = np.full(max(max_category_id, *category_name_to_id.values()) + 1, default, dtype=np.float64)
+    for name, rate in rates.items():
+        if name in category_name_to_id:
+            lut[category_name_to_id[name]] = rate
+    return lut
+
+def reason_row_lut(category_name_to_id: Mapping[str, int], max_category_id: int) -> np.ndarray:
+    """Linha de REASON_CUM de cada category_id (DEFAULT_REASON_ROW nas categorias sem distribuição própria)."""
+    lut = np.full(max(max_category_id, *category_name_to_id.values()) + 1, DEFAULT_REASON_ROW, dtype=np.int64)
+    for name, row in REASON_ROW_BY_CATEGORY.items():
+        if name in category_name_to_id:
+            lut[category_name_to_id[name]] = row
+    return lut
+
+def country_multiplier_lut(country_iso_to_id: Mapping[str, int], max_country_id: int) -> np.ndarray:
+    """
+    COUNTRY_RETURN_MULTIPLIER indexado por country_id (1.0 para países sem multiplicador configurado),
+    para obter o multiplicador de cada encomenda com um só gather em vez de um dict.get por encomenda.
+    """
+    lut = np.ones(max(max_country_id, *country_iso_to_id.values()) + 1, dtype=np.float64)
+    for iso, mult in COUNTRY_RETURN_MULTIPLIER.items():
+        if iso in country_iso_to_id:
+            lut[country_iso_to_id[iso]] = mult
+    return lut
+
 def pick_orders_to_return(
-    rng: random.Random,
-    items_by_order: Mapping[int, list[CandidateItem]],
-) -> set[int]:
-    selected: set[int] = set()
-    for order_id, items in items_by_order.items():
-        country_iso = items[0].customer_iso  # país é estável por encomenda
-        mult = COUNTRY_RETURN_MULTIPLIER.get(country_iso, 1.0)
-        p = clamp01(ORDER_LEVEL_RETURN_RATE * mult)
-        if rng.random() < p:
-            selected.add(order_id)
-    return selected
-
-def pick_items_for_order(
-    rng: random.Random,
-    items: Sequence[CandidateItem],
-    category_rates: Mapping[str, float],
+    rng_np: np.random.Generator,
+    order_country_id: np.ndarray,
+    mult_by_country_id: np.ndarray,
+) -> np.ndarray:
+    """
+    Máscara (uma posição por encomenda) das encomendas que terão devoluções, dado o país de cada uma:
+    uma uniforme por encomenda, sorteadas de uma vez, comparadas com a taxa ajustada ao país.
+    """
+    p = np.minimum(1.0, ORDER_LEVEL_RETURN_RATE * mult_by_country_id[order_country_id])
+    return rng_np.random(len(p)) < p
+
+def pick_items_for_orders(
+    rng_np: np.random.Generator,
+    item_rates: np.ndarray,
+    item_weights: np.ndarray,
+    order_offsets: np.ndarray,
     max_items: int,
-) -> list[CandidateItem]:
-    picked: list[CandidateItem] = []
-    for it in items:
-        rate = clamp01(category_rates.get(it.category_name, 0.0))
-        if rng.random() < rate:
-            picked.append(it)
-
-    if len(picked) > max_items:
-        picked = rng.sample(picked, k=max_items)
-
-    if not picked and items:
-        # garante pelo menos 1 item, ponderando pela taxa de categoria
-        weights = [category_rates.get(it.category_name, 0.01) + 1e-6 for it in items]
-        weights_norm = normalize_distribution({i: w for i, w in enumerate(weights)})
-        chosen_index = weighted_choice_key(rng, weights_norm)
-        picked = [items[int(chosen_index)]]
+) -> np.ndarray:
+    """
+    Máscara dos itens a devolver. Os itens vêm agrupados por encomenda: os da encomenda k ocupam
+    [order_offsets[k], order_offsets[k + 1]).
+      - cada item é devolvido com a taxa da sua categoria, `item_rates` (uma uniforme por item, sorteadas de uma vez);
+      - encomendas com mais de `max_items` itens escolhidos ficam com `max_items` deles, ao acaso;
+      - encomendas sem nenhum ficam com 1, ponderado por `item_weights`.
+    """
+    picked = rng_np.random(len(item_rates)) < np.clip(item_rates, 0.0, 1.0)
+    if len(order_offsets) < 2:
+        return picked
+    # soma por segmento [order_offsets[k], order_offsets[k + 1]) (encomendas nunca vazias)
+    picked_per_order = np.add.reduceat(picked.astype(np.int64), order_offsets[:-1])
+
+    # excesso (raro): mantém `max_items` dos escolhidos, sem reposição. Uma uniforme por item escolhido nessas
+    # encomendas (sorteadas de uma vez); ficam os `max_items` de menor valor em cada uma (top-K por grupo, sem ciclo)
+    over = picked_per_order > max_items
+    if over.any():
+        order_of_item = np.repeat(np.arange(len(picked_per_order)), picked_per_order)
+        chosen = np.flatnonzero(picked)
+        in_over = over[order_of_item]
+        chosen, order_of_item = chosen[in_over], order_of_item[in_over]
+        ranked = np.lexsort((rng_np.random(chosen.size), order_of_item))
+        offsets = group_offsets(order_of_item)
+        rank = np.arange(chosen.size) - np.repeat(offsets[:-1], np.diff(offsets))
+        picked[chosen[ranked][rank >= max_items]] = False
+
+    # garante pelo menos 1 item: inversão da CDF dos pesos dentro de cada encomenda vazia
+    empty = np.flatnonzero(picked_per_order == 0)
+    if empty.size:
+        cum = np.concatenate(([0.0], np.cumsum(item_weights + 1e-6)))
+        lo, hi = order_offsets[empty], order_offsets[empty + 1]
+        targets = cum[lo] + rng_np.random(empty.size) * (cum[hi] - cum[lo])
+        chosen = np.clip(np.searchsorted(cum, targets, side="right") - 1, lo, hi - 1)
+        picked[chosen] = True
 
     return picked
 
-def choose_reason_for_item(
-    rng: random.Random,
-    category_name: str,
-    reason_weights_by_category: Mapping[str, Mapping[str, float]],
-    fallback_reason_map: Mapping[str, int],
-) -> int:
-    dist = reason_weights_by_category.get(category_name, {"other": 1.0})
-    # normaliza para estabilidade
-    dist_norm = normalize_distribution(dist)
-    chosen_code = weighted_choice_key(rng, dist_norm)
-    return (
-        fallback_reason_map.get(chosen_code)
-        or fallback_reason_map.get("other")
-        or next(iter(fallback_reason_map.values()))
-    )
+def draw_reasons(rng_np: np.random.Generator, reason_rows: np.ndarray, reason_ids: np.ndarray) -> np.ndarray:
+    """
+    Sorteia o reason_id de todos os itens de uma vez: uma uniforme por item, comparada com os pesos acumulados
+    da linha de REASON_CUM da sua categoria (nº de acumulados <= u = coluna escolhida).
+    """
+    u = rng_np.random(len(reason_rows))
+    cols = (REASON_CUM[reason_rows] <= u[:, None]).sum(axis=1)
+    return reason_ids[reason_rows, cols]
 
 def build_return_rows(
-    rng: random.Random,
-    items: Sequence[CandidateItem],
+    rng_np: np.random.Generator,
+    items: CandidateColumns,
+    reason_row_by_category_id: np.ndarray,
     reason_code_to_id: Mapping[str, int],
-) -> list[tuple[int, datetime, Decimal, int]]:
-    rows: list[tuple[int, datetime, Decimal, int]] = []
-    for it in items:
-        # data de referência: depois do último pagamento e do cancelamento
-        ref_date = max(it.last_paid_at, it.order_updated_at).date()
-        delta_days = rng.randint(RETURN_MIN_DAYS, RETURN_MAX_DAYS)
-        return_dt = datetime.combine(ref_date + timedelta(days=delta_days), dtime(12, 0, 0))
-
-        refund_amount = (it.unit_price * int(it.quantity)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-        reason_id = choose_reason_for_item(rng, it.category_name, CATEGORY_REASON_DISTS, reason_code_to_id)
-        rows.append((it.order_item_id, return_dt, refund_amount, reason_id))
-    return rows
+) -> np.ndarray:
+    """
+    Constrói os registos de devolução (RETURN_DTYPE, ordenados por return_date) com as colunas calculadas
+    em bloco (NumPy), sem objetos Python por registo até ao envio para a BD:
+      - return_date: dia de referência (depois do último pagamento e do cancelamento) + [RETURN_MIN_DAYS, RETURN_MAX_DAYS]
+        dias sorteados de uma vez, às RETURN_HOUR horas;
+      - refund_amount: unit_price * quantity em cêntimos inteiros (exato; a conversão para DECIMAL é feita no INSERT);
+      - return_reason_id: pesos acumulados da categoria do item (REASON_CUM).
+    """
+    n = len(items)
+    reason_rows = reason_row_by_category_id[items.category_id]
+
+    ref_dates = np.maximum(items.last_paid_at, items.order_updated_at).astype("datetime64[D]")
+    delta_days = rng_np.integers(RETURN_MIN_DAYS, RETURN_MAX_DAYS + 1, size=n)
+    return_dates = (ref_dates + delta_days.astype("timedelta64[D]")).astype("datetime64[s]") + np.timedelta64(RETURN_HOUR, "h")
+
+    rows = np.empty(n, dtype=RETURN_DTYPE)
+    rows["order_item_id"] = items.order_item_id
+    rows["return_date"] = return_dates
+    rows["refund_cents"] = items.unit_price_cents * items.quantity
+    rows["reason_id"] = draw_reasons(rng_np, reason_rows, reason_id_table(reason_code_to_id))
+
+    # ordem por return_date (sort estável: empates mantêm a ordem de escolha)
+    return rows[np.argsort(rows["return_date"], kind="stable")]
 
 # ------------------------------------------------------------------------------------------------------------------------------------
 # ORQUESTRAÇÃO
 # ------------------------------------------------------------------------------------------------------------------------------------
 
 def run(seed: int = RANDOM_SEED) -> None:
-    rng = random.Random(seed)
+    rng_np = np.random.default_rng(seed)
     print(f"🔌 A ligar à BD '{DB_CONFIG['database']}' como '{DB_CONFIG['user']}' em '{DB_CONFIG['host']}'...")
 
     conn = get_connection()
+    # antes do primeiro statement: o MySQL não deixa mudar sql_log_bin dentro de uma transação
+    log_bin = disable_session_binlog(conn)
     conn.autocommit = False
 
     try:
@@ -348,62 +723,76 @@ def run(seed: int = RANDOM_SEED) -> None:
             cur.execute("SET time_zone = '+00:00';")
             lookups = fetch_lookup_maps(cur)
 
-        # 2) Cursor “dictionary=True” só dentro da função que precisa
+        # 2) Candidatos lidos de um cursor raw não bufferizado, diretamente para colunas NumPy
         candidates = fetch_candidate_items(conn)
 
-        if not candidates:
+        if not len(candidates):
             print("⚠️ Não existem order_items elegíveis para devolução.")
             return
 
-        # 3) Agrupar por encomenda e escolher quais devolvem
-        items_by_order: dict[int, list[CandidateItem]] = {}
-        for it in candidates:
-            items_by_order.setdefault(it.order_id, []).append(it)
-            
+        # 3) Agrupar por encomenda, com os itens de cada encomenda por order_item_id (a query não ordena: o sort
+        #    é feito aqui, sem filesort no servidor); a encomenda k ocupa [order_offsets[k], order_offsets[k + 1])
+        #    e não há dicts nem listas por encomenda
+        items = candidates[np.lexsort((candidates.order_item_id, candidates.order_id))]
+        order_offsets = group_offsets(items.order_id)
+        order_starts = order_offsets[:-1]
+
         # ordem cronológica por data do último pagamento
-        order_ids_sorted = sorted(
-            items_by_order.keys(),
-            key=lambda oid: items_by_order[oid][0].last_paid_at
-        )
+        order_chrono = np.argsort(items.last_paid_at[order_starts], kind="stable")
+
+        # escolher que encomendas devolvem (probabilístico; país é estável por encomenda)
+        order_country_id = items.customer_country_id[order_starts]
+        mult_by_country_id = country_multiplier_lut(lookups.country_iso_to_id, int(order_country_id.max()))
+        selected_orders = pick_orders_to_return(rng_np, order_country_id, mult_by_country_id)
 
-        # escolher que encomendas devolvem (probabilístico)
-        selected_orders = pick_orders_to_return(rng, items_by_order)
-        
         # manter apenas as selecionadas, na MESMA ordem cronológica
-        selected_order_ids_sorted = [oid for oid in order_ids_sorted if oid in selected_orders]
-
-        # 4) Escolher itens por encomenda (seguindo a ordem cronológica)
-        to_return_items: list[CandidateItem] = []
-        for oid in selected_order_ids_sorted:
-            to_return_items.extend(
-                pick_items_for_order(
-                    rng,
-                    items_by_order[oid],
-                    CATEGORY_ITEM_RETURN_RATE,
-                    MAX_ITEMS_PER_ORDER
-                )
-            )
-
-        if not to_return_items:
+        selected_chrono = order_chrono[selected_orders[order_chrono]]
+
+        # 4) Escolher itens por encomenda: posições dos itens das encomendas selecionadas (contíguos por encomenda,
+        #    seguindo a ordem cronológica) e os respetivos offsets
+        #    (taxas por category_id: um gather por item em vez de um dict.get pelo nome da categoria)
+        max_category_id = int(items.category_id.max())
+        item_rate_by_category_id = category_rate_lut(
+            lookups.category_name_to_id, max_category_id, CATEGORY_ITEM_RETURN_RATE, 0.0
+        )
+        item_weight_by_category_id = category_rate_lut(
+            lookups.category_name_to_id, max_category_id, CATEGORY_ITEM_RETURN_RATE, 0.01
+        )
+        item_positions, selected_offsets = take_groups(order_offsets, selected_chrono)
+        selected_category_id = items.category_id[item_positions]
+        picked = pick_items_for_orders(
+            rng_np,
+            item_rate_by_category_id[selected_category_id],
+            item_weight_by_category_id[selected_category_id],
+            selected_offsets,
+            MAX_ITEMS_PER_ORDER
+        )
+        to_return_items = items[item_positions[picked]]
+
+        if not len(to_return_items):
             print("⚠️ Nenhum order_item selecionado para devolução. Ajusta CATEGORY_ITEM_RETURN_RATE/ORDER_LEVEL_RETURN_RATE.")
             return
 
-        # 5) Idempotência por item
-        if CLEAR_EXISTING_FOR_ITEMS:
+        # 5) Idempotência: a tabela é regenerada por inteiro — na mesma transação do carregamento
+        #    (commit só no fim), salvo com TRUNCATE
+        if CLEAR_EXISTING_RETURNS:
             with conn.cursor() as cur:
-                delete_returns_for_items(cur, [it.order_item_id for it in to_return_items])
-                conn.commit()
-                
+                clear_existing_returns(cur)
 
         # 6) Construir registos e inserir em batches (ordenar por return_date)
-        records = build_return_rows(rng, to_return_items, lookups.reason_code_to_id)
-        records.sort(key=lambda r: r[1])  # r[1] = return_date
+        records = build_return_rows(
+            rng_np,
+            to_return_items,
+            reason_row_lut(lookups.category_name_to_id, max_category_id),
+            lookups.reason_code_to_id,
+        )
 
         start = time.perf_counter()
         total, batches = insert_returns_in_batches(conn, records, BATCH_SIZE)
+        restore_session_binlog(conn, log_bin)
         elapsed = time.perf_counter() - start
 
-        print(f"✅ Inseridos {total} registos em product_returns para {len(selected_order_ids_sorted)} encomendas (em {batches} batch(es)).")
+        print(f"✅ Inseridos {total} registos em product_returns para {len(selected_chrono)} encomendas (em {batches} batch(es)).")
         if elapsed > 0:
             print(f"⏱️ Tempo de inserção: {elapsed:.2f}s (~{total/elapsed:.1f} rows/s)")
 
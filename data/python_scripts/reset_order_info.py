@@ -25,17 +25,23 @@ def reset_tables(conn, tables: list[str]) -> None:
     """
     Faz TRUNCATE às tabelas indicadas, com FOREIGN_KEY_CHECKS desativado,
     de modo a não ter problemas de FKs e a repor o AUTO_INCREMENT.
+    O valor anterior de FOREIGN_KEY_CHECKS é reposto no fim, mesmo que um TRUNCATE falhe.
+    (TRUNCATE recria a tabela vazia, por isso não há índices a desativar; os scripts de inserção
+    tratam das verificações durante o seu próprio carregamento.)
     """
     with conn.cursor() as cur:
+        cur.execute("SELECT @@SESSION.foreign_key_checks")
+        (fk_checks,) = cur.fetchone()
+
         print(">> Desativar FOREIGN_KEY_CHECKS")
         cur.execute("SET FOREIGN_KEY_CHECKS = 0;")
-
-        for t in tables:
-            print(f">> TRUNCATE {t}")
-            cur.execute(f"TRUNCATE TABLE `{t}`;")
-
-        print(">> Reativar FOREIGN_KEY_CHECKS")
-        cur.execute("SET FOREIGN_KEY_CHECKS = 1;")
+        try:
+            for t in tables:
+                print(f">> TRUNCATE {t}")
+                cur.execute(f"TRUNCATE TABLE `{t}`;")
+        finally:
+            print(">> Reativar FOREIGN_KEY_CHECKS")
+            cur.execute("SET FOREIGN_KEY_CHECKS = %s;", (int(fk_checks),))
 
     # TRUNCATE faz commit implícito, mas garantimos estado consistente
     conn.commit()